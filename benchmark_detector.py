@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ONNX YOLOv8 detector pipeline on test.jpg
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from ecocopilot_app import ONNXYOLOv8Detector, YOLOPreprocessor
+
+
+def legacy_preprocess(detector, image):
+    """Original allocating preprocess, kept as the baseline"""
+    resized = cv2.resize(image, detector.input_size)
+    rgb_image = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    normalized = rgb_image.astype(np.float32) / 255.0
+    input_tensor = np.transpose(normalized, (2, 0, 1))
+    return np.expand_dims(input_tensor, axis=0)
+
+
+def legacy_postprocess(detector, outputs, original_shape):
+    """Original per-row postprocess loop, kept as the baseline"""
+    boxes = outputs[0][0]
+    confidences = outputs[1][0]
+    class_ids = outputs[2][0]
+
+    detections = []
+    h, w = original_shape
+
+    for i in range(boxes.shape[0]):
+        confidence = float(confidences[i])
+        class_id = int(class_ids[i])
+        if confidence < 0.5:
+            continue
+
+        x1, y1, x2, y2 = boxes[i]
+        scale_x = w / detector.input_size[0]
+        scale_y = h / detector.input_size[1]
+
+        x1 = max(0, min(int(x1 * scale_x), w))
+        y1 = max(0, min(int(y1 * scale_y), h))
+        x2 = max(0, min(int(x2 * scale_x), w))
+        y2 = max(0, min(int(y2 * scale_y), h))
+        if x2 <= x1 or y2 <= y1:
+            continue
+
+        class_name = detector.class_names[class_id] if class_id < len(detector.class_names) else f"class_{class_id}"
+        detections.append({
+            'bbox': [x1, y1, x2, y2],
+            'confidence': confidence,
+            'class_id': class_id,
+            'class_name': class_name
+        })
+
+    return detections
+
+
+def synthetic_outputs(num_candidates=8400, seed=0):
+    """Random fused-head outputs for machines without the model file"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 600, size=(1, num_candidates, 2)).astype(np.float32)
+    wh = rng.uniform(-20, 200, size=(1, num_candidates, 2)).astype(np.float32)
+    boxes = np.concatenate([xy, xy + wh], axis=2)
+    scores = rng.uniform(0, 1, size=(1, num_candidates)).astype(np.float32) ** 4
+    class_ids = rng.integers(0, 80, size=(1, num_candidates)).astype(np.uint8)
+    return [boxes, scores, class_ids]
+
+
+def time_call(fn, iterations):
+    """Return mean milliseconds per call"""
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def benchmark_preprocess(detector, image, iterations=200):
+    """Compare the allocating preprocess against the reusable-buffer engine"""
+    print("\n🔍 Preprocess benchmark (640x480 camera frame)")
+    frame = cv2.resize(image, (640, 480))
+
+    if np.array_equal(legacy_preprocess(detector, frame), detector.preprocess(frame)):
+        print("✅ Identical input tensors")
+    else:
+        print("❌ Input tensors differ")
+
+    letterboxed = YOLOPreprocessor(detector.input_size, letterbox=True)
+
+    legacy_ms = time_call(lambda: legacy_preprocess(detector, frame), iterations)
+    engine_ms = time_call(lambda: detector.preprocess(frame), iterations)
+    letterbox_ms = time_call(lambda: letterboxed(frame), iterations)
+    print(f"   Allocating:   {legacy_ms:.3f} ms/frame")
+    print(f"   Reused:       {engine_ms:.3f} ms/frame")
+    print(f"   Letterboxed:  {letterbox_ms:.3f} ms/frame")
+
+
+def benchmark_postprocess(detector, image, iterations=200):
+    """Compare the legacy loop against the vectorized postprocess"""
+    print("\n🔍 Postprocess benchmark")
+    if detector.session is not None:
+        input_tensor = detector.preprocess(image)
+        outputs = detector.session.run(None, {detector.input_name: input_tensor})
+        print("✅ Using model outputs for test.jpg")
+    else:
+        outputs = synthetic_outputs()
+        print("⚠️ Model not available - using synthetic outputs")
+
+    shape = image.shape[:2]
+    legacy = legacy_postprocess(detector, outputs, shape)
+    vectorized = detector.postprocess(outputs, shape)
+    if legacy == vectorized:
+        print(f"✅ Identical detections ({len(vectorized)})")
+    else:
+        print(f"❌ Detections differ: legacy={len(legacy)} vectorized={len(vectorized)}")
+
+    legacy_ms = time_call(lambda: legacy_postprocess(detector, outputs, shape), iterations)
+    vectorized_ms = time_call(lambda: detector.postprocess(outputs, shape), iterations)
+    print(f"   Legacy loop:  {legacy_ms:.3f} ms/frame")
+    print(f"   Vectorized:   {vectorized_ms:.3f} ms/frame")
+    print(f"   Speed-up:     {legacy_ms / vectorized_ms:.1f}x")
+
+    detector.nms = True
+    nms_detections = detector.postprocess(outputs, shape)
+    nms_ms = time_call(lambda: detector.postprocess(outputs, shape), iterations)
+    detector.nms = False
+    print(f"   With NMS:     {nms_ms:.3f} ms/frame ({len(vectorized)} -> {len(nms_detections)} detections)")
+
+
+def benchmark_result_formats(detector, image, frames=30):
+    """Compare allocations of list-of-dicts results against DetectionResults"""
+    print("\n🔍 Result format benchmark (one second of 30 FPS video)")
+    if detector.session is not None:
+        outputs = detector.session.run(None, {detector.input_name: detector.preprocess(image)})
+    else:
+        outputs = synthetic_outputs()
+    shape = image.shape[:2]
+
+    def measure():
+        tracemalloc.start()
+        results = [detector.postprocess(outputs, shape) for _ in range(frames)]
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return results, peak
+
+    detector.compact_results = False
+    dict_results, dict_peak = measure()
+    dict_ms = time_call(lambda: detector.postprocess(outputs, shape), frames)
+    detector.compact_results = True
+    compact_results, compact_peak = measure()
+    compact_ms = time_call(lambda: detector.postprocess(outputs, shape), frames)
+    detector.compact_results = False
+
+    if compact_results[0].to_list() == dict_results[0]:
+        print(f"✅ Identical detections ({len(dict_results[0])})")
+    else:
+        print("❌ Compact results differ from dict results")
+    print(f"   Dicts:     {dict_ms:.3f} ms/frame, {dict_peak / 1024:.0f} KiB for {frames} frames")
+    print(f"   Compact:   {compact_ms:.3f} ms/frame, {compact_peak / 1024:.0f} KiB for {frames} frames")
+
+
+def benchmark_io_binding(model_path, image, iterations=100):
+    """Compare session.run against the IO-bound inference path"""
+    print("\n🔍 IO binding benchmark")
+    if not os.path.exists(model_path):
+        print("⚠️ Model not available - skipping")
+        return
+
+    plain = ONNXYOLOv8Detector(model_path, nms=False)
+    bound = ONNXYOLOv8Detector(model_path, io_binding=True, nms=False)
+    if bound.bound_session is None:
+        print("❌ IO binding could not be enabled")
+        return
+
+    plain_outputs = plain.session.run(None, {plain.input_name: plain.preprocess(image)})
+    bound.preprocess(image)
+    bound_outputs = bound.bound_session.run()
+    identical = all(a.dtype == b.dtype and a.shape == b.shape and a.tobytes() == b.tobytes()
+                    for a, b in zip(plain_outputs, bound_outputs))
+    print("✅ Bit-identical outputs" if identical else "❌ Outputs differ")
+
+    run_ms = time_call(lambda: plain.detect(image), iterations)
+    bound_ms = time_call(lambda: bound.detect(image), iterations)
+    print(f"   session.run:  {run_ms:.3f} ms/frame")
+    print(f"   IO binding:   {bound_ms:.3f} ms/frame")
+
+
+def benchmark_batch(detector, image, num_images=32, batch_sizes=(1, 2, 4, 8, 16)):
+    """Measure detect_batch throughput across batch sizes"""
+    print("\n🔍 Batch throughput benchmark")
+    if detector.session is None:
+        print("⚠️ Model not available - skipping")
+        return
+    if not detector.supports_batching:
+        print("⚠️ Model has a fixed batch dimension - detect_batch runs images one by one")
+
+    # Mix of sizes, as in a folder of shelf photos
+    sizes = [(640, 480), (1280, 720), (800, 800), image.shape[1::-1]]
+    images = [cv2.resize(image, sizes[i % len(sizes)]) for i in range(num_images)]
+
+    expected = [detector.detect(img) for img in images]
+    original_batch_size = detector.max_batch_size
+    for batch_size in batch_sizes:
+        detector.max_batch_size = batch_size
+        if detector.detect_batch(images) != expected:
+            print(f"❌ Batch size {batch_size} returned different detections")
+        ms = time_call(lambda: detector.detect_batch(images), 3)
+        print(f"   Batch {batch_size:>2}: {num_images * 1000 / ms:7.1f} images/s ({ms / num_images:.2f} ms/image)")
+    detector.max_batch_size = original_batch_size
+
+
+def benchmark_startup(model_path, repeats=3):
+    """Compare detector load time with and without the optimized graph cache"""
+    print("\n🔍 Startup benchmark")
+    if not os.path.exists(model_path):
+        print("⚠️ Model not available - skipping")
+        return
+
+    def load_ms(**kwargs):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            ONNXYOLOv8Detector(model_path, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        uncached_ms = load_ms()
+        start = time.perf_counter()
+        ONNXYOLOv8Detector(model_path, optimized_cache_dir=cache_dir)
+        first_ms = (time.perf_counter() - start) * 1000
+        cached_ms = load_ms(optimized_cache_dir=cache_dir)
+
+    print(f"   No cache:         {uncached_ms:.1f} ms")
+    print(f"   First launch:     {first_ms:.1f} ms (optimizes and writes the cache)")
+    print(f"   Cached launch:    {cached_ms:.1f} ms")
+
+
+def main():
+    image = cv2.imread("test.jpg")
+    if image is None:
+        print("❌ Could not load test.jpg")
+        sys.exit(1)
+
+    model_path = "models/yolov8_det_w8a8.onnx"
+    benchmark_startup(model_path)
+
+    # Comparisons against the legacy code paths run without NMS
+    detector = ONNXYOLOv8Detector(model_path, nms=False)
+    benchmark_preprocess(detector, image)
+    benchmark_postprocess(detector, image)
+    benchmark_result_formats(detector, image)
+    benchmark_io_binding(model_path, image)
+    benchmark_batch(detector, image)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,12 @@
 """
 Debug script to test individual components
 """
+import os
 import sys
 import warnings
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
@@ -84,14 +87,17 @@ def test_server_connection(config):
         return False
     
     try:
-        import requests
+        from requests.exceptions import ConnectionError as RequestsConnectionError
+        import http_client
+        http_client.configure(config)
         
         # Test basic connection
         base_url = config["model_server_base_url"]
         test_url = base_url.replace("/api/v1", "")
         
         print(f"   Testing: {test_url}")
-        response = requests.get(test_url, timeout=5)
+        session = http_client.get_session()
+        response = session.get(test_url, timeout=5)
         print(f"   Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -109,7 +115,7 @@ def test_server_connection(config):
             "Authorization": "Bearer " + config["api_key"]
         }
         
-        response = requests.get(api_url, headers=headers, timeout=5)
+        response = session.get(api_url, headers=headers, timeout=5)
         print(f"   API Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -120,7 +126,7 @@ def test_server_connection(config):
             print(f"   Response: {response.text[:200]}...")
             return False
             
-    except requests.exceptions.ConnectionError:
+    except RequestsConnectionError:
         print("❌ Cannot connect to server - is AnythingLLM running?")
         return False
     except Exception as e:
@@ -136,7 +142,7 @@ def test_chat_request(config):
         return False
     
     try:
-        import requests
+        import http_client
         
         chat_url = f"{config['model_server_base_url']}/workspace/{config['workspace_slug']}/chat"
         
@@ -154,7 +160,7 @@ def test_chat_request(config):
         }
         
         print(f"   Sending to: {chat_url}")
-        response = requests.post(chat_url, headers=headers, json=data, timeout=15)
+        response = http_client.get_session().post(chat_url, headers=headers, json=data, timeout=15)
         
         print(f"   Status: {response.status_code}")
         print(f"   Response: {response.text[:300]}...")
@@ -1,5 +1,5 @@
 # green_len_2_integrated.py
-import sys, json, os, requests
+import sys, json, os
 from PIL import Image
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
@@ -19,35 +19,18 @@ BACKEND = os.environ.get("GL_BACKEND", "").lower()  # "npu" or "ollama"
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama2:7b-chat")
 
-# Try import the repo’s NPU engine if it exists (simple adapter)
-class NPUAdapter:
-    def __init__(self):
-        self.ok = False
-        try:
-            # these names are generic; change if the repo exposes different entrypoints
-            # we try a few common options:
-            try:
-                from engine import Engine  # hypothetical
-                self.engine = Engine()
-                self.ok = True
-            except Exception:
-                self.engine = None
-        except Exception:
-            self.engine = None
+GL_HEDGE_MS = os.environ.get("GL_HEDGE_MS")  # optional: hedge a silent backend after N ms
 
-    def available(self) -> bool:
-        return self.ok
+# Shared backend layer (src/llm_backends.py): the repo's in-process NPU engine
+# when GL_BACKEND=npu and it loads, with Ollama as failover
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from llm_backends import BackendRouter, InProcessBackend, OllamaBackend
 
-    def generate(self, prompt: str) -> str:
-        """Return a single string response from the NPU engine."""
-        # If your repo has a different API, adapt here:
-        # e.g. self.engine.chat(prompt) or self.engine.generate([prompt])
-        if not self.ok:
-            raise RuntimeError("NPU backend not available")
-        return self.engine.generate(prompt)  # <- adjust to your repo
-
-NPU = NPUAdapter()
+NPU = InProcessBackend.load()
 USE_NPU = (BACKEND == "npu" and NPU.available())
+LLM = BackendRouter(([NPU] if USE_NPU else []) + [OllamaBackend(OLLAMA_URL, OLLAMA_MODEL)],
+                    hedge_after_ms=float(GL_HEDGE_MS) if GL_HEDGE_MS else None,
+                    first_token_timeout=120)
 
 # =========================
 # Color palette
@@ -66,29 +49,7 @@ COLOR_ACTIVE_NAV_BAR = "#39FF14"
 # =========================
 # Worker threads
 # =========================
-class OllamaWorker(QThread):
-    response_ready = pyqtSignal(str)
-
-    def __init__(self, url: str, model: str, prompt: str, parent=None):
-        super().__init__(parent)
-        self.url = url
-        self.model = model
-        self.prompt = prompt
-
-    def run(self):
-        try:
-            payload = {"model": self.model, "prompt": self.prompt, "stream": False}
-            r = requests.post(self.url, json=payload, timeout=120)
-            r.raise_for_status()
-            data = r.json()
-            reply = (data.get("response") or "").strip()
-            if not reply:
-                reply = "(No response)"
-            self.response_ready.emit(reply)
-        except Exception as e:
-            self.response_ready.emit(f"(Error contacting Ollama: {e})")
-
-class NPUWorker(QThread):
+class LLMWorker(QThread):
     response_ready = pyqtSignal(str)
 
     def __init__(self, prompt: str, parent=None):
@@ -97,12 +58,12 @@ class NPUWorker(QThread):
 
     def run(self):
         try:
-            reply = NPU.generate(self.prompt)
+            reply = LLM.generate(self.prompt).strip()
             if not reply:
                 reply = "(No response)"
             self.response_ready.emit(reply)
         except Exception as e:
-            self.response_ready.emit(f"(NPU error: {e})")
+            self.response_ready.emit(f"(Error contacting LLM backend: {e})")
 
 # =========================
 # Custom widgets
@@ -298,7 +259,7 @@ class ChatPage(QWidget):
         row.addWidget(self.send_btn)
         layout.addLayout(row)
 
-        mode = "NPU (repo)" if USE_NPU else f"Ollama ({OLLAMA_MODEL})"
+        mode = f"NPU (repo), Ollama ({OLLAMA_MODEL}) as failover" if USE_NPU else f"Ollama ({OLLAMA_MODEL})"
         note = QLabel(f"Backend: {mode}")
         note.setStyleSheet(f"color:{COLOR_TEXT_SECONDARY}; font-size:12px;")
         layout.addWidget(note)
@@ -319,10 +280,7 @@ class ChatPage(QWidget):
         self.send_btn.setEnabled(False)
         self.append_line("Assistant", "…")
 
-        if USE_NPU:
-            self.worker = NPUWorker(text, self)
-        else:
-            self.worker = OllamaWorker(OLLAMA_URL, OLLAMA_MODEL, text, self)
+        self.worker = LLMWorker(text, self)
 
         self.worker.response_ready.connect(self.handle_response)
         self.worker.finished.connect(self.finish_worker)
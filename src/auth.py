@@ -1,6 +1,7 @@
-import requests
 import yaml
 
+import http_client
+
 def auth(
     api_key: str,
     base_url: str,
@@ -18,7 +19,7 @@ def auth(
         "accept": "application/json",
         "Authorization": "Bearer " + api_key
     }
-    auth_response = requests.get(
+    auth_response = http_client.get_session().get(
         auth_url,
         headers=headers
     )
@@ -13,24 +13,34 @@ import cv2
 import numpy as np
 import onnxruntime as ort
 import asyncio
+import concurrent.futures
 import httpx
+import hashlib
 import json
-import requests
+import math
+import platform
+import re
+import sqlite3
 import threading
 import time
 import yaml
 import easyocr
+import http_client
+from llm_backends import BackendRouter, HealthMonitor, LLMBackendError, LLMScheduler, RequestPriority
 import gradio as gr
 import webbrowser
 import speech_recognition as sr
 import pyttsx3
 import queue
 import threading
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from contextlib import contextmanager
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, 
                              QHBoxLayout, QFrame, QGridLayout, QStackedWidget, QFileDialog,
                              QTextEdit, QLineEdit, QListWidget, QListWidgetItem, QScrollArea)
-from PyQt5.QtGui import QFont, QColor, QPainter, QPen, QBrush, QPixmap, QIcon, QImage
-from PyQt5.QtCore import Qt, QRectF, QSize, pyqtSignal, QTimer, QThread, QUrl
+from PyQt5.QtGui import QFont, QColor, QPainter, QPen, QBrush, QPixmap, QIcon, QImage, QTextCursor
+from PyQt5.QtCore import Qt, QObject, QRectF, QSize, pyqtSignal, QTimer, QThread, QUrl
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 
 # =============================================================================
@@ -565,9 +575,10 @@ class GradioChatPage(QWidget):
         """
         
         def eco_copilot_chat(message, history):
-            """Eco-copilot chat function"""
+            """Eco-copilot chat function, yielding the history as tokens stream in"""
             if not message.strip():
-                return history, ""
+                yield history, ""
+                return
             
             # Add user message to history (new messages format)
             history.append({"role": "user", "content": message})
@@ -577,14 +588,17 @@ class GradioChatPage(QWidget):
                 if self.npu_chatbot is None:
                     history.append({"role": "assistant", "content": "❌ Chatbot not available. Please check your NPU server connection."})
                 else:
-                    response = self.npu_chatbot.send_eco_copilot_prompt(message)
-                    history.append({"role": "assistant", "content": response})
+                    reply = {"role": "assistant", "content": ""}
+                    history.append(reply)
+                    for chunk in self.npu_chatbot.iter_eco_copilot_prompt(message, priority="interactive"):
+                        reply["content"] += chunk
+                        yield history, ""
             except Exception as e:
                 error_msg = f"❌ Error: {str(e)}"
                 print(f"Chat error: {e}")
                 history.append({"role": "assistant", "content": error_msg})
             
-            return history, ""
+            yield history, ""
         
         # Create Gradio interface
         with gr.Blocks(css=eco_css, title="Eco-Copilot Chat") as demo:
@@ -649,13 +663,257 @@ class GradioChatPage(QWidget):
 # 3. NPU-OPTIMIZED CHATBOT
 # =============================================================================
 
+class EcoResponseCache:
+    """Two-tier cache of eco-copilot responses: in-memory LRU over SQLite.
+    
+    Keys combine the normalized product name, the prompt template version and
+    the model id, so changing either invalidates old answers. Disk entries
+    expire after ttl_seconds and the oldest-used ones are evicted beyond
+    max_disk_entries.
+    """
+    
+    def __init__(self, db_path: str = "cache/eco_responses.sqlite3", max_memory_entries: int = 128,
+                 max_disk_entries: int = 2000, ttl_seconds: float = 7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (response, created)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._db = None
+        try:
+            if os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, response TEXT NOT NULL,
+                created REAL NOT NULL, accessed REAL NOT NULL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._evict_disk(time.time())
+        except sqlite3.Error as e:
+            print(f"⚠️ Eco response cache is memory-only: {e}")
+            self._db = None
+    
+    @staticmethod
+    def normalize(product_name: str) -> str:
+        """'  Green  Apples!' -> 'green apples'"""
+        words = re.sub(r"[^\w\s-]", " ", product_name.lower()).split()
+        return " ".join(words)
+    
+    @classmethod
+    def make_key(cls, product_name: str, prompt_version, model_id: str) -> str:
+        return f"v{prompt_version}|{model_id}|{cls.normalize(product_name)}"
+    
+    def get(self, key: str):
+        """Cached response for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+            
+            if self._db is not None:
+                row = self._db.execute("SELECT response, created FROM responses WHERE key = ? AND created > ?",
+                                       (key, now - self.ttl_seconds)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+            
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, response, now, now))
+                self._evict_disk(now)
+    
+    def _remember(self, key, response, created):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+    
+    def _evict_disk(self, now):
+        expired = self._db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl_seconds,)).rowcount
+        overflow = self._db.execute("""DELETE FROM responses WHERE key IN (
+            SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)""",
+                                    (self.max_disk_entries,)).rowcount
+        self._db.commit()
+        self.evictions += max(expired, 0) + max(overflow, 0)
+    
+    def contains(self, key: str) -> bool:
+        """True if key has a live entry; does not count as a hit or miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                return True
+            if self._db is None:
+                return False
+            return self._db.execute("SELECT 1 FROM responses WHERE key = ? AND created > ?",
+                                    (key, now - self.ttl_seconds)).fetchone() is not None
+    
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._db else 0
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "evictions": self.evictions,
+            }
+
+
+class SingleFlight:
+    """Shares one upstream call between identical concurrent requests.
+    
+    The first caller for a key starts the producer on a background thread and
+    every caller, the first included, reads the same chunks as they arrive.
+    The upstream is cancelled only once all of its callers have cancelled.
+    A flight started with a RequestPriority is raised to the class of every
+    caller that joins it.
+    """
+    
+    class _Flight:
+        __slots__ = ("chunks", "done", "error", "subscribers", "cancel_event", "priority")
+        
+        def __init__(self, priority=None):
+            self.chunks = []
+            self.done = False
+            self.error = None
+            self.subscribers = 0
+            self.cancel_event = threading.Event()
+            self.priority = priority
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._flights = {}
+        self.started = 0
+        self.coalesced = 0
+    
+    def stream(self, key, produce, cancel_event: threading.Event = None, priority: RequestPriority = None):
+        """Yield the chunks of produce(cancel_event) for key, sharing any flight already running.
+        
+        priority should be the RequestPriority that produce queues with.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = self._Flight(priority)
+                self.started += 1
+                threading.Thread(target=self._pump, args=(key, flight, produce), daemon=True).start()
+            else:
+                self.coalesced += 1
+                if flight.priority is not None and priority is not None:
+                    flight.priority.raise_to(priority.value)
+            flight.subscribers += 1
+        
+        position = 0
+        try:
+            while True:
+                with self._lock:
+                    while position == len(flight.chunks) and not flight.done:
+                        if cancel_event is not None and cancel_event.is_set():
+                            return
+                        self._changed.wait(0.1)
+                    chunks = flight.chunks[position:]
+                    done = flight.done
+                for chunk in chunks:
+                    yield chunk
+                position += len(chunks)
+                if done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                if flight.subscribers == 0 and not flight.done:
+                    # Nobody is listening any more; stop the upstream and let new callers start afresh
+                    flight.cancel_event.set()
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+    
+    def call(self, key, fn, priority: RequestPriority = None):
+        """Coalesced fn() for callers that want a single result."""
+        return list(self.stream(key, lambda cancel_event: (fn(),), priority=priority))[0]
+    
+    def _pump(self, key, flight, produce):
+        try:
+            for chunk in produce(flight.cancel_event):
+                with self._lock:
+                    flight.chunks.append(chunk)
+                    self._changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                flight.done = True
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                self._changed.notify_all()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {"started": self.started, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+
 class NPUChatbot:
     """NPU-optimized chatbot with INT8 quantization for local inference"""
     
+    # Bump whenever eco_copilot_prompt changes so cached answers are not reused
+    # (2: streamed answers cached before the UTF-8 fix were garbled)
+    ECO_PROMPT_VERSION = 2
+    # Same for shopping_list_prompt and the per-item JSON it asks for
+    LIST_PROMPT_VERSION = 2
+    
+    # Shopping-list batching: rough token costs for Llama 3.1 8B Chat 8K
+    LIST_PROMPT_TOKENS = 300        # instructions around the item list
+    LIST_TOKENS_PER_ITEM = 80       # item name in, one JSON object out
+    MAX_ITEMS_PER_CALL = 30         # longer lists get unreliable JSON
+    context_tokens = 8192           # overridden by config.yaml context_tokens
+    
+    # Shared by every instance so the scan page, Gradio chat and voice assistant coalesce
+    in_flight = SingleFlight()
+    # ...and queue for the model server by priority instead of all at once
+    scheduler = LLMScheduler()
+    # ...and share one background health check per server
+    health = HealthMonitor()
+    
     def __init__(self):
+        self.cache = None
         try:
             with open("config.yaml", "r") as file:
                 config = yaml.safe_load(file)
+            http_client.configure(config)
             
             self.api_key = config["api_key"]
             self.base_url = config["model_server_base_url"]
@@ -668,50 +926,107 @@ class NPUChatbot:
             else:
                 self.chat_url = f"{self.base_url}/workspace/{self.workspace_slug}/chat"
             
+            # Timing of the most recent request
+            self.last_ttft_ms = None
+            self.last_total_ms = None
+            
+            # Answers are cached per product, prompt version and model
+            self.model_id = config.get("model_id", self.workspace_slug)
+            self.context_tokens = config.get("context_tokens", 8192)
+            self.cache = EcoResponseCache(ttl_seconds=config.get("response_cache_ttl_hours", 168) * 3600)
+            
             self.headers = {
                 "accept": "application/json",
                 "Content-Type": "application/json",
                 "Authorization": "Bearer " + self.api_key
             }
             
-            # Check if NPU server is running
-            self.server_status = self.check_server_status()
-            if self.server_status:
-                print("✅ NPU Chatbot initialized with INT8 optimization")
-                print("✅ NPU Model Server is running")
-            else:
-                print("⚠️ NPU Chatbot initialized - server status check failed")
-                print("💡 But auth works, so server is likely running")
-                # Don't fail initialization if status check fails but auth works
-                self.server_status = True
+            # AnythingLLM by default; llm_backends in config.yaml adds Ollama / in-process failover
+            self.scheduler.configure(config)
+            self.health.configure(config)
+            self.backend = BackendRouter.from_config(config, self.scheduler, self.health)
+            
+            # Server health is probed in the background; requests fail fast while it is down
+            self.server_status = True
+            print("✅ NPU Chatbot initialized with INT8 optimization")
+            print("🩺 NPU Model Server status is checked in the background")
             
         except Exception as e:
             print(f"❌ Error initializing NPU Chatbot: {e}")
             self.chat_url = None
             self.server_status = False
+            self.backend = None
+    
+    @property
+    def http(self):
+        """Keep-alive session shared with every other model-server client"""
+        return http_client.get_session()
     
     def check_server_status(self):
-        """Check if the NPU model server is running"""
-        try:
-            # Try to connect to the server using the API endpoint
-            response = requests.get(f"{self.base_url}/workspace/{self.workspace_slug}", 
-                                  headers=self.headers, timeout=5)
-            return response.status_code == 200
-        except:
-            try:
-                # Fallback: try the root endpoint
-                response = requests.get(f"{self.base_url.replace('/api/v1', '')}/", timeout=5)
-                return response.status_code == 200
-            except:
-                return False
+        """Last known reachability of the model backends (cached, never blocks)"""
+        if self.backend is None:
+            return False
+        return self.backend.available()
+    
+    def eco_copilot_prompt(self, product_name: str) -> str:
+        """Build the eco-copilot prompt for a product"""
+        # Create a shorter, more focused eco-copilot prompt
+        return f"""Analyze this product for environmental impact: {product_name}
+
+Provide:
+1. CO₂ estimate (kg CO₂e per serving)
+2. Two sustainable alternatives with brief explanations
+3. One encouraging message
+
+Keep response concise and practical."""
     
-    def send_eco_copilot_prompt(self, product_name: str) -> str:
-        """Send eco-copilot prompt to NPU-optimized model"""
+    def iter_eco_copilot_prompt(self, product_name: str, cancel_event: threading.Event = None,
+                                priority: str = "scan"):
+        """Yield the eco-copilot response for a product as text chunks arrive
+        
+        Cached answers are yielded in one piece; complete successful answers
+        are added to the cache. priority is an LLMScheduler class; a
+        coalesced request is raised to its most urgent caller's class.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = EcoResponseCache.make_key(product_name, self.ECO_PROMPT_VERSION, self.model_id)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.last_ttft_ms = self.last_total_ms = 0.0
+                yield cached
+                return
+        
+        # Identical prompts from the scan page, Gradio chat and voice share one request
+        flight_key = ("eco", self.chat_url, cache_key or EcoResponseCache.normalize(product_name))
+        flight_priority = RequestPriority(priority)
+        yield from self.in_flight.stream(
+            flight_key,
+            lambda flight_cancel: self._iter_and_cache(product_name, cache_key, flight_cancel, flight_priority),
+            cancel_event, flight_priority)
+    
+    def _iter_and_cache(self, product_name: str, cache_key: str, cancel_event: threading.Event,
+                        priority="scan"):
+        """Model response chunks; a complete answer is cached before the flight ends"""
+        chunks = []
+        for chunk in self._iter_model_response(product_name, cancel_event, priority):
+            chunks.append(chunk)
+            yield chunk
+        
+        # Errors arrive as chunks starting with ❌; never cache those or partial answers
+        failed = any(chunk.startswith("❌") for chunk in chunks)
+        if cache_key is not None and chunks and not failed and not cancel_event.is_set():
+            self.cache.put(cache_key, "".join(chunks))
+    
+    def _iter_model_response(self, product_name: str, cancel_event: threading.Event = None,
+                             priority="scan"):
+        """Uncached eco-copilot request"""
         if not self.chat_url:
-            return "❌ Chatbot not available - check NPU model server"
+            yield "❌ Chatbot not available - check NPU model server"
+            return
         
-        if not self.server_status:
-            return """❌ NPU Model Server Not Running
+        if not self.server_status or not self.backend.available():
+            yield """❌ NPU Model Server Not Running
 
 To start the NPU model server:
 
@@ -731,107 +1046,985 @@ To start the NPU model server:
    python src/workspaces.py
 
 Once the server is running, try the NPU chatbot again!"""
+            return
         
-        # Create a shorter, more focused eco-copilot prompt
-        prompt = f"""Analyze this product for environmental impact: {product_name}
-
-Provide:
-1. CO₂ estimate (kg CO₂e per serving)
-2. Two sustainable alternatives with brief explanations
-3. One encouraging message
-
-Keep response concise and practical."""
-
+        prompt = self.eco_copilot_prompt(product_name)
         try:
             if self.stream:
-                return self.streaming_chat(prompt)
+                yield from self.iter_stream_chat(prompt, cancel_event, priority=priority)
             else:
-                return self.blocking_chat(prompt)
+                start = time.perf_counter()
+                response = self.blocking_chat(prompt, priority=priority)
+                # Nothing arrives before the whole response does
+                self.last_ttft_ms = self.last_total_ms = (time.perf_counter() - start) * 1000
+                yield response
         except Exception as e:
-            return f"❌ Error sending to NPU model: {str(e)}"
-    
-    def blocking_chat(self, message: str) -> str:
-        """Send blocking chat request to NPU model"""
-        data = {
-            "message": message,
-            "mode": "chat",
-            "sessionId": "eco-copilot-session",
-            "attachments": []
-        }
+            yield f"❌ Error sending to NPU model: {str(e)}"
+    
+    def send_eco_copilot_prompt(self, product_name: str, on_token=None,
+                                cancel_event: threading.Event = None, priority: str = "scan") -> str:
+        """Send eco-copilot prompt to NPU-optimized model
         
+        on_token, if given, is called with each chunk of text as it arrives.
+        """
+        chunks = []
+        for chunk in self.iter_eco_copilot_prompt(product_name, cancel_event, priority):
+            chunks.append(chunk)
+            if on_token is not None:
+                on_token(chunk)
+        return "".join(chunks)
+    
+    def blocking_chat(self, message: str, timeout: float = 15, priority: str = "interactive") -> str:
+        """Send blocking chat request to NPU model, sharing identical requests in flight"""
+        flight_priority = priority if isinstance(priority, RequestPriority) else RequestPriority(priority)
+        return self.in_flight.call(("chat", self.chat_url, message),
+                                   lambda: self._blocking_chat(message, timeout, flight_priority), flight_priority)
+    
+    def _blocking_chat(self, message: str, timeout: float = 15, priority: str = "interactive") -> str:
+        """Uncoalesced blocking chat request"""
         try:
-            print(f"🔍 Chat URL: {self.chat_url}")
-            print(f"🔍 Request Data: {data}")
-            print(f"🔍 Headers: {self.headers}")
-            
-            response = requests.post(
-                self.chat_url,
-                headers=self.headers,
-                json=data,
-                timeout=15  # Reduced timeout for faster feedback
-            )
-            
-            print(f"🔍 Response Status: {response.status_code}")
-            print(f"🔍 Response Headers: {response.headers}")
-            print(f"🔍 Response Text: {response.text[:500]}...")  # First 500 chars
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                print(f"🔍 Response JSON: {response_data}")
-                
-                # Handle the correct response format
-                if 'textResponse' in response_data:
-                    return response_data['textResponse']
-                elif 'error' in response_data and response_data['error']:
-                    return f"❌ NPU Model Error: {response_data['error']}"
-                else:
-                    return f"❌ Unexpected response format: {response_data}"
-            else:
-                return f"❌ NPU Model Error: {response.status_code} - {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Connection Error: {str(e)}"
-        except Exception as e:
-            return f"❌ Unexpected Error: {str(e)}"
+            start = time.perf_counter()
+            response = self.backend.generate(message, timeout=timeout, priority=priority)
+            print(f"🔍 {self.backend.last_backend.name} answered in {(time.perf_counter() - start) * 1000:.0f} ms")
+            return response
+        except LLMBackendError as e:
+            return f"❌ {e}"
+    
+    def iter_stream_chat(self, message: str, cancel_event: threading.Event = None, timeout: float = None,
+                         priority: str = "interactive"):
+        """Yield text chunks from the model backend as they arrive
+        
+        Stops early once cancel_event is set. Records last_ttft_ms and
+        last_total_ms. Backend failures are yielded as a ❌ chunk.
+        """
+        start = time.perf_counter()
+        self.last_ttft_ms = None
+        try:
+            for text in self.backend.stream(message, cancel_event, timeout, priority):
+                if self.last_ttft_ms is None:
+                    self.last_ttft_ms = (time.perf_counter() - start) * 1000
+                    print(f"⏱️ Time to first token: {self.last_ttft_ms:.0f} ms ({self.backend.last_backend.name})")
+                yield text
+        except LLMBackendError as e:
+            yield f"❌ {e}"
+        if cancel_event is not None and cancel_event.is_set():
+            print("⚠️ Streaming chat cancelled")
+        
+        self.last_total_ms = (time.perf_counter() - start) * 1000
     
     def streaming_chat(self, message: str) -> str:
         """Send streaming chat request to NPU model"""
-        data = {
-            "message": message,
-            "mode": "chat",
-            "sessionId": "eco-copilot-session",
-            "attachments": []
-        }
+        return "".join(self.iter_stream_chat(message)) or "No response received"
+    
+    def complete(self, message: str, cancel_event: threading.Event = None, timeout: float = 15,
+                 priority: str = "interactive") -> str:
+        """Whole response text, using the configured streaming or blocking endpoint"""
+        if self.stream:
+            return "".join(self.iter_stream_chat(message, cancel_event, timeout, priority))
+        return self.blocking_chat(message, timeout, priority)
+    
+    def shopping_list_prompt(self, items: list) -> str:
+        """Build the batch prompt asking for one JSON object per item"""
+        numbered = "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+        return f"""Estimate the environmental impact of each item on this shopping list:
+
+{numbered}
+
+Reply with ONLY a JSON array, no other text. Include one object per item, in the same order:
+[{{"item": "<item name as given>", "co2e_kg": <kg CO₂e per typical purchase, number>, "eco_friendly": <true or false>, "alternatives": ["<sustainable alternative>", "<sustainable alternative>"]}}]"""
+    
+    def shopping_list_chunks(self, items: list) -> list:
+        """Split items so each prompt plus its JSON reply fits the context window"""
+        budget = self.context_tokens - self.LIST_PROMPT_TOKENS
+        per_call = max(1, min(self.MAX_ITEMS_PER_CALL, budget // self.LIST_TOKENS_PER_ITEM))
+        # Spread items evenly instead of leaving a tiny last chunk
+        calls = math.ceil(len(items) / per_call)
+        size = math.ceil(len(items) / calls) if calls else 0
+        return [items[i:i + size] for i in range(0, len(items), size)] if size else []
+    
+    @staticmethod
+    def extract_json_array(text: str):
+        """First JSON array of objects in a model reply, ignoring code fences and brackets in prose"""
+        text = re.sub(r"```(?:json)?", "", text)
+        decoder = json.JSONDecoder()
+        for match in re.finditer(r"\[", text):
+            try:
+                value, _ = decoder.raw_decode(text, match.start())
+            except json.JSONDecodeError:
+                continue
+            if isinstance(value, list) and value and all(isinstance(entry, dict) for entry in value):
+                return value
+        return None
+    
+    @staticmethod
+    def parse_shopping_list_response(text: str, items: list) -> list:
+        """Validate the model's JSON reply; returns one entry per item, None where it is missing or invalid"""
+        entries = NPUChatbot.extract_json_array(text)
+        if entries is None:
+            return [None] * len(items)
+        
+        by_name = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                co2e = float(entry.get("co2e_kg"))
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(co2e) or co2e < 0:
+                continue
+            # bool("false") is True; only accept real booleans or "true"/"false"
+            eco_friendly = entry.get("eco_friendly")
+            if isinstance(eco_friendly, str) and eco_friendly.strip().lower() in ("true", "false"):
+                eco_friendly = eco_friendly.strip().lower() == "true"
+            if not isinstance(eco_friendly, bool):
+                continue
+            alternatives = entry.get("alternatives") or []
+            if not isinstance(alternatives, list):
+                alternatives = [alternatives]
+            by_name.setdefault(EcoResponseCache.normalize(str(entry.get("item", ""))), {
+                "co2e_kg": co2e,
+                "eco_friendly": eco_friendly,
+                "alternatives": [str(alt) for alt in alternatives if alt][:2],
+            })
         
+        results = []
+        for index, item in enumerate(items):
+            result = by_name.get(EcoResponseCache.normalize(item))
+            if result is None and len(entries) == len(items) and isinstance(entries[index], dict):
+                # Names were paraphrased but the order was kept
+                result = by_name.get(EcoResponseCache.normalize(str(entries[index].get("item", ""))))
+            results.append(result)
+        return results
+    
+    def analyze_shopping_list(self, items: list, cancel_event: threading.Event = None) -> list:
+        """Analyze a whole shopping list in as few LLM calls as possible
+        
+        Returns one dict per item with 'item', 'co2e_kg', 'eco_friendly' and
+        'alternatives', or with 'error' when no valid estimate came back.
+        Items are answered from the response cache where possible.
+        """
+        if not self.chat_url or not self.server_status:
+            return [{"item": item, "error": "Chatbot not available - check NPU model server"} for item in items]
+        
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            cache_key = None
+            if self.cache is not None:
+                cache_key = EcoResponseCache.make_key(item, f"list{self.LIST_PROMPT_VERSION}", self.model_id)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    results[index] = json.loads(cached)
+                    continue
+            pending.append((index, item, cache_key))
+        
+        error = None
+        chunks = self.shopping_list_chunks(pending)
+        if pending:
+            print(f"🛒 Analyzing {len(pending)} items in {len(chunks)} LLM call(s), {len(items) - len(pending)} cached")
+        for chunk in chunks:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            chunk_items = [item for _, item, _ in chunk]
+            reply = self.complete(self.shopping_list_prompt(chunk_items), cancel_event, timeout=120, priority="batch")
+            if reply.startswith("❌"):
+                error = reply
+                continue
+            for (index, _, cache_key), result in zip(chunk, self.parse_shopping_list_response(reply, chunk_items)):
+                if result is not None:
+                    results[index] = result
+                    if cache_key is not None:
+                        self.cache.put(cache_key, json.dumps(result))
+        
+        for index, item in enumerate(items):
+            if results[index] is None:
+                results[index] = {"error": error or "No valid estimate in the model's reply"}
+            results[index] = dict(results[index], item=item)
+        return results
+
+
+class LLMRequestExecutor(QObject):
+    """Runs chatbot calls on a worker pool and hands results back on the Qt thread.
+    
+    Requests submitted on the same channel supersede each other: submitting a
+    new one cancels the older request, which is either never started or has its
+    result discarded. Callbacks always run on the thread that owns the executor.
+    
+    With on_progress, fn receives a progress(value) keyword argument whose
+    values are forwarded to on_progress as they are produced. With
+    cancellable=True, fn receives a cancel_event keyword argument that is set
+    when the request is cancelled, so long-running calls can stop early.
+    """
+    
+    _delivered = pyqtSignal(int, bool, object)  # request id, ok, result or exception
+    _progressed = pyqtSignal(int, object)       # request id, partial result
+    
+    class _Request:
+        __slots__ = ("channel", "future", "on_result", "on_error", "on_progress", "cancel_event")
+        
+        def __init__(self, channel, on_result, on_error, on_progress, cancel_event):
+            self.channel = channel
+            self.future = None
+            self.on_result = on_result
+            self.on_error = on_error
+            self.on_progress = on_progress
+            self.cancel_event = cancel_event
+    
+    def __init__(self, parent=None, max_workers: int = 2):
+        super().__init__(parent)
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                           thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._requests = {}  # request id -> _Request
+        self._latest = {}    # channel -> newest request id
+        self.cancelled = 0
+        self._delivered.connect(self._deliver)
+        self._progressed.connect(self._deliver_progress)
+    
+    def submit(self, fn, *args, channel: str = None, on_result=None, on_error=None,
+               on_progress=None, cancellable: bool = False, **kwargs) -> int:
+        """Run fn(*args, **kwargs) in the pool; returns a request id."""
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            if channel is not None:
+                previous = self._latest.get(channel)
+                self._latest[channel] = request_id
+            else:
+                previous = None
+        if previous is not None:
+            self.cancel_request(previous)
+        
+        cancel_event = threading.Event()
+        if on_progress is not None:
+            kwargs["progress"] = lambda value: self._progressed.emit(request_id, value)
+        if cancellable:
+            kwargs["cancel_event"] = cancel_event
+        
+        # Register before submitting so the worker never sees an unknown id
+        with self._lock:
+            self._requests[request_id] = self._Request(channel, on_result, on_error, on_progress, cancel_event)
+        future = self._pool.submit(self._run, request_id, fn, args, kwargs)
+        with self._lock:
+            if request_id in self._requests:
+                self._requests[request_id].future = future
+        return request_id
+    
+    def _run(self, request_id, fn, args, kwargs):
+        if self.is_cancelled(request_id):
+            return
         try:
-            response = requests.post(
-                self.chat_url,
-                headers=self.headers,
-                json=data,
-                timeout=30
-            )
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._delivered.emit(request_id, False, e)
+        else:
+            self._delivered.emit(request_id, True, result)
+    
+    def _deliver(self, request_id, ok, result):
+        with self._lock:
+            request = self._requests.pop(request_id, None)
+        if request is None:
+            return  # cancelled while running
+        with self._lock:
+            if request.channel is not None and self._latest.get(request.channel) == request_id:
+                del self._latest[request.channel]
+        callback = request.on_result if ok else request.on_error
+        if callback is not None:
+            callback(result)
+        elif not ok:
+            print(f"❌ LLM request {request_id} failed: {result}")
+    
+    def _deliver_progress(self, request_id, value):
+        with self._lock:
+            request = self._requests.get(request_id)
+        if request is not None and request.on_progress is not None:
+            request.on_progress(value)
+    
+    def is_cancelled(self, request_id: int) -> bool:
+        """True once a request has been cancelled (or already delivered)."""
+        with self._lock:
+            return request_id not in self._requests
+    
+    def cancel_request(self, request_id: int) -> bool:
+        """Cancel one request; returns True if it was still pending or running."""
+        with self._lock:
+            request = self._requests.pop(request_id, None)
+        if request is None:
+            return False
+        request.cancel_event.set()
+        if request.future is not None:
+            request.future.cancel()  # only succeeds if the worker has not picked it up yet
+        self.cancelled += 1
+        return True
+    
+    def cancel(self, channel: str) -> bool:
+        """Cancel the newest request on a channel."""
+        with self._lock:
+            request_id = self._latest.pop(channel, None)
+        return request_id is not None and self.cancel_request(request_id)
+    
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._requests)
+    
+    def shutdown(self):
+        with self._lock:
+            for request in self._requests.values():
+                request.cancel_event.set()
+            self._requests.clear()
+            self._latest.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class CpuLoadSampler:
+    """Machine CPU load as a fraction of all cores.
+    
+    Uses the 1-minute load average per core where the OS reports one
+    (os.getloadavg), so other processes, such as the model server, count
+    too. Elsewhere (Windows) it falls back to this process's share of the
+    machine since the previous sample.
+    """
+    
+    def __init__(self):
+        self._mark = (time.perf_counter(), time.process_time())
+    
+    def sample(self) -> float:
+        wall_now, cpu_now = time.perf_counter(), time.process_time()
+        wall_start, cpu_start = self._mark
+        self._mark = (wall_now, cpu_now)
+        cores = os.cpu_count() or 1
+        if hasattr(os, "getloadavg"):
+            return min(1.0, os.getloadavg()[0] / cores)
+        wall = wall_now - wall_start
+        return (cpu_now - cpu_start) / (wall * cores) if wall > 0 else 0.0
+
+
+class EcoCachePrewarmer(QThread):
+    """Fills the eco response cache for common grocery products while the app is idle.
+    
+    Starts start_delay seconds after launch and asks about one product at a
+    time. It waits while user requests are pending on the executor or other
+    requests are in flight, and drops a prewarm stream as soon as a user
+    request arrives (the product is retried later). Pauses keep model time
+    within npu_budget and machine CPU load (CpuLoadSampler) within
+    cpu_budget. Nothing is sent
+    while the model server is down, and products whose request failed are
+    retried with exponential backoff from retry_backoff up to max_retry_backoff.
+    """
+    
+    def __init__(self, npu_chatbot, products, executor: LLMRequestExecutor = None, start_delay: float = 10.0,
+                 npu_budget: float = 0.25, cpu_budget: float = 0.5, poll_interval: float = 0.5,
+                 retry_backoff: float = 5.0, max_retry_backoff: float = 300.0):
+        super().__init__()
+        self.npu_chatbot = npu_chatbot
+        self.products = list(products)
+        self.executor = executor
+        self.start_delay = start_delay
+        self.npu_budget = npu_budget
+        self.cpu_budget = cpu_budget
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._stop_event = threading.Event()
+        self._cpu = CpuLoadSampler()
+        self.warmed = 0
+        self.skipped = 0
+        self.preempted = 0
+        self.failed = 0
+    
+    def is_busy(self, own_flights: int = 0) -> bool:
+        """True while user-initiated requests are waiting or running."""
+        if self.executor is not None and self.executor.pending() > 0:
+            return True
+        return NPUChatbot.in_flight.stats()["in_flight"] > own_flights
+    
+    def _cpu_usage(self, interval: float) -> float:
+        """Machine CPU load (fraction of all cores) after waiting interval seconds."""
+        self._cpu.sample()
+        self._stop_event.wait(interval)
+        return self._cpu.sample()
+    
+    def _wait_for_idle(self) -> bool:
+        """Block until the server is up and nothing else needs the NPU or CPU; False once stopped."""
+        while not self._stop_event.is_set():
+            if not self.npu_chatbot.check_server_status():
+                self._stop_event.wait(self.poll_interval)
+                continue
+            if not self.is_busy() and self._cpu_usage(self.poll_interval) <= self.cpu_budget:
+                return True
+        return False
+    
+    def run(self):
+        if self._stop_event.wait(self.start_delay):
+            return
+        pending = deque(self.products)
+        failures = {}   # product -> consecutive failed attempts
+        retry_at = {}   # product -> monotonic time it may be retried
+        while pending and self._wait_for_idle():
+            product = pending.popleft()
+            if retry_at.get(product, 0) > time.monotonic():
+                pending.append(product)
+                # Only backed-off products left: sleep until the first one is due
+                if all(retry_at.get(other, 0) > time.monotonic() for other in pending):
+                    self._stop_event.wait(max(0.0, min(retry_at[other] for other in pending) - time.monotonic()))
+                continue
+            cache_key = EcoResponseCache.make_key(product, NPUChatbot.ECO_PROMPT_VERSION, self.npu_chatbot.model_id)
+            if self.npu_chatbot.cache.contains(cache_key):
+                self.skipped += 1
+                continue
             
-            if response.status_code == 200:
-                # For now, return the full response (streaming can be added later)
-                return response.json().get('textResponse', 'No response received')
-            else:
-                return f"❌ NPU Model Error: {response.status_code} - {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"❌ Connection Error: {str(e)}"
+            start = time.perf_counter()
+            cancel_event = threading.Event()
+            chunks = []
+            for chunk in self.npu_chatbot.iter_eco_copilot_prompt(product, cancel_event, priority="prefetch"):
+                chunks.append(chunk)
+                if self._stop_event.is_set() or self.is_busy(own_flights=1):
+                    # A user request takes priority; it may even share this flight
+                    cancel_event.set()
+                    break
+            elapsed = time.perf_counter() - start
+            
+            response = "".join(chunks)
+            if cancel_event.is_set():
+                self.preempted += 1
+                pending.append(product)
+            elif not response or response.startswith("❌"):
+                self.failed += 1
+                failures[product] = failures.get(product, 0) + 1
+                backoff = min(self.retry_backoff * 2 ** (failures[product] - 1), self.max_retry_backoff)
+                retry_at[product] = time.monotonic() + backoff
+                pending.append(product)
+                print(f"⚠️ Prewarm for {product} failed, retrying in {backoff:.0f} s")
+            elif self.npu_chatbot.cache.contains(cache_key):
+                self.warmed += 1
+                print(f"🔥 Prewarmed eco-copilot answer for {product} in {elapsed * 1000:.0f} ms")
+            
+            # Stay within the NPU budget: idle for (1 - budget) / budget of the time spent
+            self._stop_event.wait(elapsed * (1 - self.npu_budget) / self.npu_budget)
+        
+        if not self._stop_event.is_set():
+            print(f"🔥 Prewarm finished: {self.stats()}")
+    
+    def stop(self):
+        self._stop_event.set()
+        self.wait(2000)
+    
+    def stats(self) -> dict:
+        return {"warmed": self.warmed, "already_cached": self.skipped, "preempted": self.preempted,
+                "failed": self.failed}
 
 
 # =============================================================================
 # 2. ONNX DETECTOR AND CAMERA THREAD
 # =============================================================================
 
+class LatencyTracker:
+    """Thread-safe rolling latency windows with percentiles, one per pipeline stage."""
+    
+    def __init__(self, window: int = 300):
+        self.window = window
+        self._samples = {}  # stage -> deque of (timestamp, milliseconds)
+        self._lock = threading.Lock()
+    
+    def record(self, stage: str, start: float) -> float:
+        """Record the time since start (a perf_counter value) for stage; returns now."""
+        now = time.perf_counter()
+        self.record_ms(stage, (now - start) * 1000, now)
+        return now
+    
+    def record_ms(self, stage: str, milliseconds: float, timestamp: float = None):
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append((timestamp, milliseconds))
+    
+    @contextmanager
+    def measure(self, stage: str):
+        """Context manager timing the enclosed block as stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, start)
+    
+    def stage_stats(self, stage: str) -> dict:
+        """count, mean, p50, p95, p99, max, last (ms) and rate (events/s) for one stage."""
+        with self._lock:
+            samples = list(self._samples.get(stage, ()))
+        if not samples:
+            return None
+        
+        timestamps = np.array([sample[0] for sample in samples])
+        values = np.array([sample[1] for sample in samples])
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        elapsed = timestamps[-1] - timestamps[0]
+        return {
+            "count": len(values),
+            "mean": float(values.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(values.max()),
+            "last": float(values[-1]),
+            "rate": (len(values) - 1) / elapsed if elapsed > 0 else 0.0,
+        }
+    
+    def stats(self) -> dict:
+        """stage_stats for every stage seen so far."""
+        with self._lock:
+            stages = list(self._samples)
+        return {stage: self.stage_stats(stage) for stage in stages}
+    
+    def summary(self) -> str:
+        """Human-readable table of all stages."""
+        lines = [f"{'stage':<14}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for stage, stats in self.stats().items():
+            lines.append(f"{stage:<14}{stats['count']:>7}{stats['p50']:>9.2f}{stats['p95']:>9.2f}"
+                         f"{stats['p99']:>9.2f}{stats['max']:>9.2f}")
+        return "\n".join(lines)
+    
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class ONNXSessionConfig:
+    """ONNX Runtime session settings for the detector."""
+    
+    OPTIMIZATION_LEVELS = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    EXECUTION_MODES = {
+        "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+        "parallel": ort.ExecutionMode.ORT_PARALLEL,
+    }
+    
+    def __init__(self, graph_optimization: str = "all", intra_op_threads: int = 0,
+                 inter_op_threads: int = 0, execution_mode: str = "sequential",
+                 cpu_mem_arena: bool = True, mem_pattern: bool = True, providers: list = None):
+        """Thread counts of 0 let ONNX Runtime choose."""
+        if graph_optimization not in self.OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown graph optimization level: {graph_optimization}")
+        if execution_mode not in self.EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+        
+        self.graph_optimization = graph_optimization
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.execution_mode = execution_mode
+        self.cpu_mem_arena = cpu_mem_arena
+        self.mem_pattern = mem_pattern
+        self.providers = providers
+    
+    def session_options(self) -> ort.SessionOptions:
+        """Build the ort.SessionOptions for these settings."""
+        options = ort.SessionOptions()
+        options.graph_optimization_level = self.OPTIMIZATION_LEVELS[self.graph_optimization]
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = self.EXECUTION_MODES[self.execution_mode]
+        options.enable_cpu_mem_arena = self.cpu_mem_arena
+        options.enable_mem_pattern = self.mem_pattern
+        return options
+    
+    def create_session(self, model_path: str, optimized_model_path: str = None) -> ort.InferenceSession:
+        """Create an inference session for model_path with these settings.
+        
+        If optimized_model_path is given, ONNX Runtime also writes the optimized graph there.
+        """
+        options = self.session_options()
+        if optimized_model_path:
+            options.optimized_model_filepath = optimized_model_path
+        return ort.InferenceSession(model_path, sess_options=options, providers=self.providers)
+    
+    def copy(self, **changes) -> "ONNXSessionConfig":
+        """Return a copy of this config with some settings replaced."""
+        data = self.to_dict()
+        data.update(changes)
+        return ONNXSessionConfig.from_dict(data)
+    
+    def to_dict(self) -> dict:
+        return {
+            "graph_optimization": self.graph_optimization,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "execution_mode": self.execution_mode,
+            "cpu_mem_arena": self.cpu_mem_arena,
+            "mem_pattern": self.mem_pattern,
+            "providers": self.providers,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ONNXSessionConfig":
+        return cls(**data)
+    
+    def __repr__(self):
+        return (f"ONNXSessionConfig(opt={self.graph_optimization}, intra={self.intra_op_threads}, "
+                f"inter={self.inter_op_threads}, mode={self.execution_mode})")
+
+
+class SessionAutotuner:
+    """Benchmarks a few session configurations on this machine and caches the fastest."""
+    
+    def __init__(self, cache_path: str = "cache/session_tuning.json", warmup_runs: int = 2, timed_runs: int = 5):
+        self.cache_path = cache_path
+        self.warmup_runs = warmup_runs
+        self.timed_runs = timed_runs
+    
+    def machine_key(self, model_path: str) -> str:
+        """Identify this CPU, ONNX Runtime build and model file."""
+        try:
+            model_size = os.path.getsize(model_path)
+        except OSError:
+            model_size = 0
+        return "|".join([
+            platform.node(), platform.machine(), platform.processor(), str(os.cpu_count()),
+            ort.__version__, os.path.abspath(model_path), str(model_size)
+        ])
+    
+    def candidates(self) -> list:
+        """A small grid of thread counts and optimization levels."""
+        cores = os.cpu_count() or 1
+        thread_counts = sorted({1, max(1, cores // 2), cores})
+        configs = [ONNXSessionConfig(graph_optimization=level, intra_op_threads=threads)
+                   for level in ("extended", "all") for threads in thread_counts]
+        configs.append(ONNXSessionConfig(graph_optimization="all", intra_op_threads=cores,
+                                         inter_op_threads=2, execution_mode="parallel"))
+        return configs
+    
+    def tune(self, model_path: str, input_size: tuple = (640, 640)) -> ONNXSessionConfig:
+        """Return the cached winner for this machine, benchmarking on first use."""
+        if not os.path.exists(model_path):
+            return ONNXSessionConfig()
+        
+        key = self.machine_key(model_path)
+        cache = self._load_cache()
+        if key in cache:
+            return ONNXSessionConfig.from_dict(cache[key])
+        
+        width, height = input_size
+        dummy = np.zeros((1, 3, height, width), dtype=np.float32)
+        best_config, best_ms = None, float("inf")
+        
+        print("⏱️ Autotuning ONNX Runtime session options for this machine...")
+        for config in self.candidates():
+            try:
+                session = config.create_session(model_path)
+                feed = {session.get_inputs()[0].name: dummy}
+                for _ in range(self.warmup_runs):
+                    session.run(None, feed)
+                timings = []
+                for _ in range(self.timed_runs):
+                    start = time.perf_counter()
+                    session.run(None, feed)
+                    timings.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                print(f"⚠️ Skipping {config}: {e}")
+                continue
+            
+            median_ms = sorted(timings)[len(timings) // 2]
+            print(f"   {config}: {median_ms:.1f} ms")
+            if median_ms < best_ms:
+                best_config, best_ms = config, median_ms
+        
+        if best_config is None:
+            return ONNXSessionConfig()
+        
+        print(f"✅ Selected {best_config} ({best_ms:.1f} ms)")
+        cache[key] = best_config.to_dict()
+        self._save_cache(cache)
+        return best_config
+    
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_cache(self, cache: dict):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "w") as file:
+                json.dump(cache, file, indent=2)
+        except OSError as e:
+            print(f"⚠️ Could not save session tuning cache: {e}")
+
+
+class OptimizedModelCache:
+    """Stores ONNX Runtime's optimized graph on disk so later launches skip graph optimization."""
+    
+    def __init__(self, cache_dir: str = "cache/optimized_models"):
+        self.cache_dir = cache_dir
+        self.last_hit = False
+    
+    def cache_path(self, model_path: str, config: ONNXSessionConfig) -> str:
+        """Cache file for this model content, ONNX Runtime version and optimization level."""
+        digest = hashlib.sha256()
+        with open(model_path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        key = "_".join([
+            digest.hexdigest()[:16], f"ort{ort.__version__}", config.graph_optimization,
+            platform.machine() or "cpu"
+        ])
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        return os.path.join(self.cache_dir, f"{name}_{key}.onnx")
+    
+    def create_session(self, model_path: str, config: ONNXSessionConfig) -> ort.InferenceSession:
+        """Load the cached optimized graph, or build the session and write the cache."""
+        cached_path = self.cache_path(model_path, config)
+        self.last_hit = os.path.exists(cached_path)
+        if self.last_hit:
+            try:
+                # The graph is already optimized; don't pay for it again
+                return config.copy(graph_optimization="disable").create_session(cached_path)
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable optimized model cache {cached_path}: {e}")
+                self.last_hit = False
+        
+        if config.graph_optimization == "disable":
+            return config.create_session(model_path)
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write under a temporary name so a crash never leaves a truncated cache entry
+            temp_path = f"{cached_path}.{os.getpid()}.tmp"
+            session = config.create_session(model_path, optimized_model_path=temp_path)
+            os.replace(temp_path, cached_path)
+            return session
+        except OSError as e:
+            print(f"⚠️ Could not write optimized model cache: {e}")
+            return config.create_session(model_path)
+
+
+class YOLOPreprocessor:
+    """Preprocessing engine that writes YOLOv8 input tensors into reusable buffers."""
+    
+    def __init__(self, input_size: tuple = (640, 640), letterbox: bool = False, pad_value: int = 114):
+        """Allocate the resize canvas and the float32 input tensor once."""
+        self.input_size = input_size
+        self.letterbox = letterbox
+        self.pad_value = pad_value
+        
+        width, height = input_size
+        self._canvas = np.full((height, width, 3), pad_value, dtype=np.uint8)
+        self._tensor = np.empty((1, 3, height, width), dtype=np.float32)
+        self._geometry = None
+    
+    def geometry(self, original_shape: tuple) -> tuple:
+        """Return (new_w, new_h, pad_x, pad_y) for an image of the given (h, w)."""
+        h, w = original_shape[:2]
+        width, height = self.input_size
+        if not self.letterbox:
+            return width, height, 0, 0
+        
+        ratio = min(width / w, height / h)
+        new_w = min(width, int(round(w * ratio)))
+        new_h = min(height, int(round(h * ratio)))
+        return new_w, new_h, (width - new_w) // 2, (height - new_h) // 2
+    
+    def box_transform(self, original_shape: tuple) -> tuple:
+        """Return (offset, scale) mapping model [x1, y1, x2, y2] back to the original image."""
+        h, w = original_shape[:2]
+        new_w, new_h, pad_x, pad_y = self.geometry(original_shape)
+        offset = np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float64)
+        scale = np.array([w / new_w, h / new_h, w / new_w, h / new_h])
+        return offset, scale
+    
+    def __call__(self, image: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """Resize, swap BGR to RGB and normalize image into out (default: the owned tensor)."""
+        if out is None:
+            out = self._tensor[0]
+        
+        geometry = self.geometry(image.shape)
+        new_w, new_h, pad_x, pad_y = geometry
+        if geometry != self._geometry:
+            # Padding only needs repainting when the letterbox layout changes
+            self._canvas.fill(self.pad_value)
+            self._geometry = geometry
+        
+        # Resize straight into the canvas (or its letterboxed window)
+        window = self._canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+        cv2.resize(image, (new_w, new_h), dst=window)
+        
+        # Channel swap, HWC -> CHW and [0, 1] scaling in a single pass
+        np.divide(self._canvas[:, :, ::-1].transpose(2, 0, 1), 255.0, out=out, dtype=np.float32)
+        return out
+    
+    @property
+    def tensor(self) -> np.ndarray:
+        """The owned [1, 3, H, W] input tensor written by the last call."""
+        return self._tensor
+
+
+class IOBoundSession:
+    """Runs a session through IO binding, with the input and all outputs bound to buffers allocated once."""
+    
+    def __init__(self, session: ort.InferenceSession, input_name: str, input_tensor: np.ndarray):
+        self.session = session
+        self._binding = session.io_binding()
+        
+        # OrtValues wrap the numpy memory without copying, so writing into
+        # input_tensor is all it takes to feed the next frame
+        self._values = [ort.OrtValue.ortvalue_from_numpy(input_tensor)]
+        self._binding.bind_ortvalue_input(input_name, self._values[0])
+        
+        # One regular run tells us the output shapes and dtypes to preallocate
+        warmup_outputs = session.run(None, {input_name: input_tensor})
+        self.outputs = [np.empty_like(output) for output in warmup_outputs]
+        for meta, buffer in zip(session.get_outputs(), self.outputs):
+            value = ort.OrtValue.ortvalue_from_numpy(buffer)
+            self._values.append(value)
+            self._binding.bind_ortvalue_output(meta.name, value)
+    
+    def run(self) -> list:
+        """Run inference in place; the returned arrays are overwritten by the next run."""
+        self.session.run_with_iobinding(self._binding)
+        return self.outputs
+
+
+class Detection(Mapping):
+    """Lazy, read-only dict view of one row of a DetectionResults array."""
+    
+    __slots__ = ('_results', '_index')
+    
+    KEYS = ('bbox', 'confidence', 'class_id', 'class_name')
+    
+    def __init__(self, results: "DetectionResults", index: int):
+        self._results = results
+        self._index = index
+    
+    def __getitem__(self, key):
+        row = self._results.array[self._index]
+        if key == 'bbox':
+            return row['bbox'].tolist()
+        if key == 'confidence':
+            return float(row['confidence'])
+        if key == 'class_id':
+            return int(row['class_id'])
+        if key == 'class_name':
+            return self._results.class_name(int(row['class_id']))
+        raise KeyError(key)
+    
+    def __iter__(self):
+        return iter(self.KEYS)
+    
+    def __len__(self):
+        return len(self.KEYS)
+    
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.KEYS}
+    
+    def __repr__(self):
+        return f"Detection({self.to_dict()})"
+
+
+class DetectionResults:
+    """Compact detections for one image, stored as a single NumPy structured array.
+    
+    Iterating or indexing yields Detection views, so code written for the
+    list-of-dicts format keeps working without building the dicts up front.
+    """
+    
+    __slots__ = ('array', 'class_names')
+    
+    DTYPE = np.dtype([('bbox', np.int32, (4,)), ('confidence', np.float32), ('class_id', np.int32)])
+    
+    def __init__(self, array: np.ndarray, class_names: list):
+        self.array = array
+        self.class_names = class_names
+    
+    @classmethod
+    def from_arrays(cls, boxes: np.ndarray, confidences: np.ndarray, class_ids: np.ndarray,
+                    class_names: list) -> "DetectionResults":
+        array = np.empty(len(confidences), dtype=cls.DTYPE)
+        array['bbox'] = boxes
+        array['confidence'] = confidences
+        array['class_id'] = class_ids
+        return cls(array, class_names)
+    
+    def class_name(self, class_id: int) -> str:
+        return self.class_names[class_id] if class_id < len(self.class_names) else f"class_{class_id}"
+    
+    def top(self) -> Detection:
+        """The highest-confidence detection, or None."""
+        if len(self.array) == 0:
+            return None
+        return Detection(self, int(self.array['confidence'].argmax()))
+    
+    def to_list(self) -> list:
+        """Materialize the classic list-of-dicts format."""
+        return [detection.to_dict() for detection in self]
+    
+    def __len__(self):
+        return len(self.array)
+    
+    def __getitem__(self, index: int) -> Detection:
+        if index < 0:
+            index += len(self.array)
+        if not 0 <= index < len(self.array):
+            raise IndexError("detection index out of range")
+        return Detection(self, index)
+    
+    def __iter__(self):
+        return (Detection(self, i) for i in range(len(self.array)))
+    
+    def __repr__(self):
+        return f"DetectionResults({len(self.array)} detections)"
+
+
 class ONNXYOLOv8Detector:
     """ONNX YOLOv8 Detector for real-time object detection."""
     
-    def __init__(self, model_path: str = "models/yolov8_det_w8a8.onnx"):
-        """Initialize ONNX YOLOv8 detector."""
+    # COCO classes that show up in a grocery basket, for use as an allow-list
+    GROCERY_CLASSES = [
+        'bottle', 'wine glass', 'cup', 'bowl', 'banana', 'apple', 'sandwich', 'orange',
+        'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake'
+    ]
+    
+    def __init__(self, model_path: str = "models/yolov8_det_w8a8.onnx", letterbox: bool = False,
+                 max_batch_size: int = 8, session_config: ONNXSessionConfig = None,
+                 autotune: bool = False, optimized_cache_dir: str = None, io_binding: bool = False,
+                 nms: bool = True, iou_threshold: float = 0.45, max_detections: int = 100,
+                 allowed_classes: list = None, excluded_classes: list = None,
+                 compact_results: bool = False, metrics: LatencyTracker = None):
+        """Initialize ONNX YOLOv8 detector.
+        
+        session_config overrides the ONNX Runtime defaults; autotune=True picks
+        the fastest configuration for this machine (cached after the first run).
+        optimized_cache_dir enables loading a previously optimized graph from disk.
+        io_binding=True runs detect() through preallocated, bound input/output buffers.
+        nms enables class-aware non-max suppression at iou_threshold, keeping
+        at most max_detections boxes.
+        allowed_classes / excluded_classes (ids or names) are applied as a mask
+        inside postprocess, before any detection dict is built.
+        compact_results=True returns DetectionResults instead of lists of dicts.
+        metrics receives per-stage timings (a private tracker is created if omitted).
+        """
         self.model_path = model_path
         self.input_size = (640, 640)
+        self.conf_threshold = 0.5
+        self.nms = nms
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+        self.compact_results = compact_results
+        self.metrics = metrics or LatencyTracker()
+        self.max_batch_size = max_batch_size
+        self._batch_tensor = None
+        
+        # Preprocessing writes into buffers owned by the detector, so calls
+        # that share them are serialized
+        self.preprocessor = YOLOPreprocessor(self.input_size, letterbox=letterbox)
+        self._lock = threading.Lock()
         
         # COCO class names
         self.class_names = [
@@ -847,81 +2040,189 @@ class ONNXYOLOv8Detector:
             'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier', 'toothbrush'
         ]
         
+        self.set_class_filter(allowed_classes, excluded_classes)
+        
         # Load ONNX model
         try:
-            self.session = ort.InferenceSession(model_path)
+            if session_config is None and autotune:
+                session_config = SessionAutotuner().tune(model_path, self.input_size)
+            self.session_config = session_config or ONNXSessionConfig()
+            
+            start = time.perf_counter()
+            if optimized_cache_dir:
+                model_cache = OptimizedModelCache(optimized_cache_dir)
+                self.session = model_cache.create_session(model_path, self.session_config)
+                cache_note = "optimized graph cache hit" if model_cache.last_hit else "optimized graph cached"
+            else:
+                self.session = self.session_config.create_session(model_path)
+                cache_note = "no optimized graph cache"
+            self.load_time_ms = (time.perf_counter() - start) * 1000
+            
             print(f"Loading ONNX model from: {model_path}")
-            print("ONNX model loaded successfully!")
+            print(f"ONNX model loaded successfully in {self.load_time_ms:.0f} ms ({cache_note})!")
         except Exception as e:
             print(f"Error loading ONNX model: {e}")
             self.session = None
-    
-    def preprocess(self, image: np.ndarray) -> np.ndarray:
-        """Preprocess image for YOLOv8 model."""
-        # Resize to model input size
-        resized = cv2.resize(image, self.input_size)
-        
-        # Convert BGR to RGB
-        rgb_image = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
         
-        # Normalize to [0, 1]
-        normalized = rgb_image.astype(np.float32) / 255.0
+        # Input metadata never changes for a loaded session, so look it up once
+        if self.session is not None:
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            # Static exports pin the batch dimension; dynamic ones use a symbolic name
+            self.supports_batching = not isinstance(model_input.shape[0], int)
+        else:
+            self.input_name = None
+            self.supports_batching = False
         
-        # Add batch dimension and transpose to CHW format
-        input_tensor = np.transpose(normalized, (2, 0, 1))
-        input_tensor = np.expand_dims(input_tensor, axis=0)
+        self.bound_session = None
+        if io_binding and self.session is not None:
+            try:
+                self.bound_session = IOBoundSession(self.session, self.input_name, self.preprocessor.tensor)
+                print("✅ ONNX IO binding enabled")
+            except Exception as e:
+                print(f"⚠️ IO binding unavailable, using session.run: {e}")
+    
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        """Preprocess image for YOLOv8 model into the reusable [1, 3, H, W] tensor."""
+        self.preprocessor(image)
+        return self.preprocessor.tensor
+    
+    def set_class_filter(self, allowed_classes: list = None, excluded_classes: list = None):
+        """Restrict detections to allowed_classes and/or drop excluded_classes (ids or names)."""
+        self._class_mask = np.ones(len(self.class_names), dtype=bool)
+        self._allow_unknown = allowed_classes is None
+        if allowed_classes is not None:
+            self._class_mask[:] = False
+            self._class_mask[self._class_indices(allowed_classes)] = True
+        if excluded_classes is not None:
+            self._class_mask[self._class_indices(excluded_classes)] = False
+    
+    def _class_indices(self, classes: list) -> list:
+        """Resolve a list of class ids and/or COCO names to ids."""
+        indices = []
+        for item in classes:
+            if isinstance(item, str):
+                if item not in self.class_names:
+                    raise ValueError(f"Unknown class name: {item}")
+                indices.append(self.class_names.index(item))
+            else:
+                indices.append(int(item))
+        return indices
+    
+    def class_filter_mask(self, class_ids: np.ndarray) -> np.ndarray:
+        """Boolean mask of which class_ids pass the allow/deny lists."""
+        class_ids = class_ids.astype(np.int64)
+        known = (class_ids >= 0) & (class_ids < len(self._class_mask))
+        allowed = self._class_mask[np.where(known, class_ids, 0)]
+        return np.where(known, allowed, self._allow_unknown)
+    
+    def decode_outputs(self, outputs: list) -> tuple:
+        """Return (boxes [N, 4] xyxy, confidences [N], class_ids [N]) for the first image.
         
-        return input_tensor
+        Supports the fused export (boxes, scores, class ids) and the raw YOLOv8
+        head ([1, 84, 8400] or [1, 8400, 84]: cx, cy, w, h followed by class scores).
+        """
+        if len(outputs) >= 3:
+            boxes = outputs[0][0]  # Shape: [8400, 4] - remove batch dimension
+            confidences = outputs[1][0]  # Shape: [8400] - remove batch dimension
+            class_ids = outputs[2][0]  # Shape: [8400] - remove batch dimension
+            return boxes, confidences, class_ids
+        
+        predictions = outputs[0][0]
+        if predictions.shape[0] < predictions.shape[1]:
+            predictions = predictions.T  # [84, 8400] -> [8400, 84]
+        
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = np.take_along_axis(class_scores, class_ids[:, None], axis=1)[:, 0]
+        
+        centers, sizes = predictions[:, 0:2], predictions[:, 2:4] / 2
+        boxes = np.concatenate([centers - sizes, centers + sizes], axis=1)
+        return boxes, confidences, class_ids
+    
+    @staticmethod
+    def non_max_suppression(boxes: np.ndarray, confidences: np.ndarray, class_ids: np.ndarray,
+                            iou_threshold: float, max_detections: int) -> np.ndarray:
+        """Class-aware greedy NMS; returns kept indices in descending confidence order."""
+        # Shift each class into its own coordinate range so boxes of different
+        # classes never overlap, then run a single NMS over everything
+        span = float(boxes.max() - boxes.min()) + 1.0
+        shifted = boxes.astype(np.float64) + class_ids.astype(np.float64)[:, None] * span
+        x1, y1, x2, y2 = shifted.T
+        areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+        
+        order = np.argsort(-confidences, kind="stable")
+        keep = []
+        while order.size > 0 and len(keep) < max_detections:
+            best, rest = order[0], order[1:]
+            keep.append(best)
+            
+            # IoU of the best remaining box against all others, in one shot
+            inter_w = np.maximum(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0)
+            inter_h = np.maximum(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0)
+            intersection = inter_w * inter_h
+            iou = intersection / np.maximum(areas[best] + areas[rest] - intersection, 1e-9)
+            order = rest[iou <= iou_threshold]
+        
+        return np.array(keep, dtype=np.int64)
     
     def postprocess(self, outputs: list, original_shape: tuple) -> list:
         """Postprocess YOLOv8 model outputs to get detections."""
         if not outputs:
-            return []
-            
-        boxes = outputs[0][0]  # Shape: [8400, 4] - remove batch dimension
-        confidences = outputs[1][0]  # Shape: [8400] - remove batch dimension
-        class_ids = outputs[2][0]  # Shape: [8400] - remove batch dimension
+            return self._empty_results()
+        
+        boxes, confidences, class_ids = self.decode_outputs(outputs)
         
-        detections = []
         h, w = original_shape
         
-        num_detections = boxes.shape[0]
+        # Filter out low confidence and unwanted classes before touching the boxes
+        keep = confidences >= self.conf_threshold
+        if not self._class_mask.all() or not self._allow_unknown:
+            keep &= self.class_filter_mask(class_ids)
+        if not keep.any():
+            return self._empty_results()
+        
+        boxes = boxes[keep]
+        confidences = confidences[keep]
+        class_ids = class_ids[keep].astype(np.int64)
+        
+        # Collapse overlapping duplicates of the same class (empty boxes can't
+        # survive the bounds check below, so they never enter NMS)
+        if self.nms:
+            nonempty = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+            boxes, confidences, class_ids = boxes[nonempty], confidences[nonempty], class_ids[nonempty]
+            if boxes.shape[0] == 0:
+                return self._empty_results()
+
+            kept = self.non_max_suppression(boxes, confidences, class_ids,
+                                            self.iou_threshold, self.max_detections)
+            boxes, confidences, class_ids = boxes[kept], confidences[kept], class_ids[kept]
+        
+        # Map [x1, y1, x2, y2] from model input space (stretched or letterboxed)
+        # to original image size, truncating like int() and clamping to the image bounds
+        # (computed in the output's float precision, as the per-row scalar math was)
+        offset, scale = self.preprocessor.box_transform(original_shape)
+        dtype = np.result_type(boxes.dtype, np.float32)
+        limits = np.array([w, h, w, h])
+        scaled = np.trunc((boxes.astype(dtype) - offset.astype(dtype)) * scale.astype(dtype))
+        scaled = np.clip(scaled, 0, limits).astype(np.int64)
+        
+        # Skip invalid bounding boxes
+        valid = (scaled[:, 2] > scaled[:, 0]) & (scaled[:, 3] > scaled[:, 1])
+        
+        if self.compact_results:
+            return DetectionResults.from_arrays(scaled[valid], confidences[valid], class_ids[valid],
+                                                self.class_names)
         
-        for i in range(num_detections):
-            # Get confidence and class ID
-            confidence = float(confidences[i])
-            class_id = int(class_ids[i])
-            
-            # Filter out low confidence detections
-            if confidence < 0.5:
-                continue
-            
-            # Get bounding box coordinates [x1, y1, x2, y2]
-            x1, y1, x2, y2 = boxes[i]
-            
-            # Scale bounding box coordinates from model input size to original image size
-            scale_x = w / self.input_size[0]
-            scale_y = h / self.input_size[1]
-            
-            x1 = int(x1 * scale_x)
-            y1 = int(y1 * scale_y)
-            x2 = int(x2 * scale_x)
-            y2 = int(y2 * scale_y)
-            
-            # Ensure coordinates are within image bounds
-            x1 = max(0, min(x1, w))
-            y1 = max(0, min(y1, h))
-            x2 = max(0, min(x2, w))
-            y2 = max(0, min(y2, h))
-            
-            # Skip invalid bounding boxes
-            if x2 <= x1 or y2 <= y1:
-                continue
-            
-            class_name = self.class_names[class_id] if class_id < len(self.class_names) else f"class_{class_id}"
+        detections = []
+        num_classes = len(self.class_names)
+        for bbox, confidence, class_id in zip(scaled[valid].tolist(),
+                                              confidences[valid].tolist(),
+                                              class_ids[valid].tolist()):
+            class_name = self.class_names[class_id] if class_id < num_classes else f"class_{class_id}"
             
             detections.append({
-                'bbox': [x1, y1, x2, y2],
+                'bbox': bbox,
                 'confidence': confidence,
                 'class_id': class_id,
                 'class_name': class_name
@@ -929,35 +2230,558 @@ class ONNXYOLOv8Detector:
         
         return detections
     
+    def _empty_results(self):
+        if self.compact_results:
+            return DetectionResults(np.empty(0, dtype=DetectionResults.DTYPE), self.class_names)
+        return []
+    
     def detect(self, image: np.ndarray) -> list:
         """Run object detection on an image."""
         if self.session is None:
-            return []
+            return self._empty_results()
             
-        # Preprocess image
-        input_tensor = self.preprocess(image)
-        
-        # Run inference
-        input_name = self.session.get_inputs()[0].name
-        outputs = self.session.run(None, {input_name: input_tensor})
+        with self._lock:
+            # Preprocess image
+            start = time.perf_counter()
+            input_tensor = self.preprocess(image)
+            start = self.metrics.record("preprocess", start)
+            
+            # Run inference
+            if self.bound_session is not None:
+                # Bound outputs are reused, so postprocess before releasing the lock
+                outputs = self.bound_session.run()
+                start = self.metrics.record("inference", start)
+                detections = self.postprocess(outputs, image.shape[:2])
+                self.metrics.record("postprocess", start)
+                return detections
+            
+            outputs = self.session.run(None, {self.input_name: input_tensor})
+            start = self.metrics.record("inference", start)
         
         # Postprocess outputs
         detections = self.postprocess(outputs, image.shape[:2])
+        self.metrics.record("postprocess", start)
         
         return detections
+    
+    def detect_batch(self, images: list) -> list:
+        """Run object detection on a list of images, returning one detection list per image."""
+        if self.session is None:
+            return [self._empty_results() for _ in images]
+        if not self.supports_batching:
+            # Model was exported with a fixed batch of 1
+            return [self.detect(image) for image in images]
+        
+        results = []
+        for start in range(0, len(images), self.max_batch_size):
+            chunk = images[start:start + self.max_batch_size]
+            
+            with self._lock:
+                # Preprocess each image straight into its slot of the batch tensor
+                batch = self._get_batch_tensor(len(chunk))
+                for i, image in enumerate(chunk):
+                    self.preprocessor(image, out=batch[i])
+                
+                # Run inference once for the whole chunk
+                outputs = self.session.run(None, {self.input_name: batch})
+            
+            # Postprocess each image against its own original size
+            for i, image in enumerate(chunk):
+                image_outputs = [output[i:i + 1] for output in outputs]
+                results.append(self.postprocess(image_outputs, image.shape[:2]))
+        
+        return results
+    
+    def _get_batch_tensor(self, batch_size: int) -> np.ndarray:
+        """Return a [batch_size, 3, H, W] view of the reusable batch tensor."""
+        if self._batch_tensor is None or self._batch_tensor.shape[0] < batch_size:
+            width, height = self.input_size
+            self._batch_tensor = np.empty((max(batch_size, self.max_batch_size), 3, height, width),
+                                          dtype=np.float32)
+        return self._batch_tensor[:batch_size]
+
+
+class LatestFrameBuffer:
+    """Single-slot, latest-frame-wins handoff between the capture and inference threads.
+    
+    put() never blocks: a frame that was not picked up in time is replaced
+    (and counted as dropped) instead of queueing behind the detector.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._sequence = 0
+        self._taken = 0
+        self._closed = False
+        self.frames_put = 0
+        self.frames_dropped = 0
+    
+    def put(self, frame: np.ndarray, timestamp: float):
+        with self._condition:
+            if self._sequence > self._taken:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._timestamp = timestamp
+            self._sequence += 1
+            self.frames_put += 1
+            self._condition.notify()
+    
+    def get(self, timeout: float = None) -> tuple:
+        """Wait for a frame newer than the last one taken; returns (frame, timestamp) or (None, None)."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._closed or self._sequence > self._taken, timeout):
+                return None, None
+            if self._closed:
+                return None, None
+            self._taken = self._sequence
+            return self._frame, self._timestamp
+    
+    def close(self):
+        """Wake any waiting consumer and refuse further frames."""
+        with self._condition:
+            self._closed = True
+            self._frame = None
+            self._condition.notify_all()
+    
+    def reset(self):
+        with self._condition:
+            self._frame = None
+            self._sequence = self._taken = 0
+            self._closed = False
+            self.frames_put = self.frames_dropped = 0
+
+
+class AdaptiveDetectionScheduler:
+    """Chooses how many captured frames pass between detector runs.
+    
+    The interval is derived from the rolling inference latency and capture
+    rate so the detector stays within cpu_budget (fraction of wall time it
+    may be busy). It backs off further when inference exceeds
+    latency_budget_ms or the machine has less than min_headroom CPU left.
+    Machine load comes from CpuLoadSampler.
+    """
+    
+    def __init__(self, cpu_budget: float = 0.5, latency_budget_ms: float = None,
+                 min_headroom: float = 0.2, max_interval: int = 10, retune_seconds: float = 0.5):
+        self.cpu_budget = cpu_budget
+        self.latency_budget_ms = latency_budget_ms
+        self.min_headroom = min_headroom
+        self.max_interval = max_interval
+        self.retune_seconds = retune_seconds
+        self.reset()
+    
+    def reset(self):
+        self.detection_interval = 1
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.detections_run = 0
+        self.cpu_usage = 0.0
+        self._since_last_detection = 0
+        self._frame_interval = None
+        self._latency = None
+        self._last_frame_at = None
+        self._started_at = time.perf_counter()
+        self._retuned_at = self._started_at
+        self._cpu = CpuLoadSampler()
+    
+    def should_detect(self, timestamp: float) -> bool:
+        """Called by the capture thread for each frame."""
+        if self._last_frame_at is not None:
+            self._frame_interval = self._ema(self._frame_interval, timestamp - self._last_frame_at)
+        self._last_frame_at = timestamp
+        self.frames_seen += 1
+        
+        if timestamp - self._retuned_at >= self.retune_seconds:
+            self._retune(timestamp)
+        
+        self._since_last_detection += 1
+        if self._since_last_detection >= self.detection_interval:
+            self._since_last_detection = 0
+            return True
+        self.frames_skipped += 1
+        return False
+    
+    def record_inference(self, milliseconds: float):
+        """Called by the inference thread after each detector run."""
+        self._latency = self._ema(self._latency, milliseconds / 1000)
+        self.detections_run += 1
+    
+    def _retune(self, now: float):
+        self.cpu_usage = self._cpu.sample()
+        self._retuned_at = now
+        
+        if self._latency is None or not self._frame_interval:
+            return
+        
+        interval = math.ceil(self._latency / (self._frame_interval * self.cpu_budget))
+        if self.latency_budget_ms and self._latency * 1000 > self.latency_budget_ms:
+            interval = max(interval, self.detection_interval + 1)
+        if 1 - self.cpu_usage < self.min_headroom:
+            interval = max(interval, self.detection_interval + 1)
+        self.detection_interval = max(1, min(self.max_interval, interval))
+    
+    @staticmethod
+    def _ema(current, sample, alpha=0.2):
+        return sample if current is None else current + alpha * (sample - current)
+    
+    def stats(self) -> dict:
+        """Current cadence and rates."""
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        return {
+            "detection_interval": self.detection_interval,
+            "capture_fps": 1 / self._frame_interval if self._frame_interval else 0.0,
+            "detection_fps": self.detections_run / elapsed,
+            "skip_ratio": self.frames_skipped / self.frames_seen if self.frames_seen else 0.0,
+            "inference_ms": self._latency * 1000 if self._latency is not None else 0.0,
+            "cpu_usage": self.cpu_usage,
+        }
+
+
+class Track:
+    """One tracked object: last matched box plus a per-second velocity estimate."""
+    
+    __slots__ = ('track_id', 'bbox', 'velocity', 'class_id', 'class_name', 'confidence',
+                 'hits', 'updated_at')
+    
+    def __init__(self, track_id: int, bbox: np.ndarray, class_id: int, class_name: str,
+                 confidence: float, timestamp: float):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.velocity = np.zeros(4)
+        self.class_id = class_id
+        self.class_name = class_name
+        self.confidence = confidence
+        self.hits = 1
+        self.updated_at = timestamp
+    
+    def predicted_bbox(self, timestamp: float) -> np.ndarray:
+        return self.bbox + self.velocity * (timestamp - self.updated_at)
+    
+    def to_dict(self, timestamp: float) -> dict:
+        return {
+            'track_id': self.track_id,
+            'bbox': [int(v) for v in self.predicted_bbox(timestamp)],
+            'confidence': self.confidence,
+            'class_id': self.class_id,
+            'class_name': self.class_name,
+            'hits': self.hits
+        }
+
+
+class ObjectTracker:
+    """Lightweight IoU tracker with constant-velocity prediction between detector runs.
+    
+    Detections are matched to predicted track boxes greedily by IoU within
+    the same class; matched tracks get an alpha-beta velocity update, new
+    detections start tracks, and tracks unseen for max_age_seconds expire.
+    Thread-safe: the inference thread updates while the UI predicts.
+    """
+    
+    def __init__(self, iou_threshold: float = 0.3, max_age_seconds: float = 1.0,
+                 min_hits: int = 2, velocity_smoothing: float = 0.5):
+        self.iou_threshold = iou_threshold
+        self.max_age_seconds = max_age_seconds
+        self.min_hits = min_hits
+        self.velocity_smoothing = velocity_smoothing
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self._tracks = []
+            self._next_id = 1
+    
+    @staticmethod
+    def pairwise_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """IoU matrix between [N, 4] and [M, 4] xyxy boxes."""
+        top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+        bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+        area_a = np.prod(np.clip(a[:, 2:] - a[:, :2], 0, None), axis=1)
+        area_b = np.prod(np.clip(b[:, 2:] - b[:, :2], 0, None), axis=1)
+        return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+    
+    @staticmethod
+    def _as_arrays(detections) -> tuple:
+        if isinstance(detections, DetectionResults):
+            array = detections.array
+            return (array['bbox'].astype(np.float64), array['confidence'].astype(np.float64),
+                    array['class_id'].astype(np.int64), [d['class_name'] for d in detections])
+        boxes = np.array([d['bbox'] for d in detections], dtype=np.float64).reshape(-1, 4)
+        confidences = np.array([d['confidence'] for d in detections], dtype=np.float64)
+        class_ids = np.array([d['class_id'] for d in detections], dtype=np.int64)
+        return boxes, confidences, class_ids, [d['class_name'] for d in detections]
+    
+    def update(self, detections, timestamp: float) -> list:
+        """Fold in one detector result taken at timestamp; returns confirmed tracks as dicts."""
+        boxes, confidences, class_ids, class_names = self._as_arrays(detections)
+        
+        with self._lock:
+            # Expire tracks that have not been seen for too long
+            self._tracks = [t for t in self._tracks if timestamp - t.updated_at <= self.max_age_seconds]
+            
+            matched_detections = set()
+            if self._tracks and len(boxes):
+                predicted = np.array([t.predicted_bbox(timestamp) for t in self._tracks])
+                track_classes = np.array([t.class_id for t in self._tracks])
+                iou = self.pairwise_iou(predicted, boxes)
+                iou[track_classes[:, None] != class_ids[None, :]] = 0
+                
+                # Greedy assignment, best overlap first; boxes that do not overlap never match,
+                # which also ends the loop for iou_threshold <= 0
+                while True:
+                    t_index, d_index = np.unravel_index(np.argmax(iou), iou.shape)
+                    best = iou[t_index, d_index]
+                    if best <= 0 or best < self.iou_threshold:
+                        break
+                    self._match(self._tracks[t_index], boxes[d_index], confidences[d_index], timestamp)
+                    matched_detections.add(d_index)
+                    iou[t_index, :] = 0
+                    iou[:, d_index] = 0
+            
+            for d_index in range(len(boxes)):
+                if d_index not in matched_detections:
+                    self._tracks.append(Track(self._next_id, boxes[d_index], int(class_ids[d_index]),
+                                              class_names[d_index], float(confidences[d_index]), timestamp))
+                    self._next_id += 1
+            
+            return [t.to_dict(timestamp) for t in self._tracks if t.hits >= self.min_hits]
+    
+    def _match(self, track: Track, bbox: np.ndarray, confidence: float, timestamp: float):
+        dt = timestamp - track.updated_at
+        if dt > 0:
+            measured = (bbox - track.bbox) / dt
+            track.velocity += self.velocity_smoothing * (measured - track.velocity)
+        track.bbox = bbox
+        track.confidence = float(confidence)
+        track.hits += 1
+        track.updated_at = timestamp
+    
+    def predict(self, timestamp: float) -> list:
+        """Confirmed, unexpired tracks extrapolated to timestamp (for frames without a detector run)."""
+        with self._lock:
+            return [t.to_dict(timestamp) for t in self._tracks
+                    if t.hits >= self.min_hits and timestamp - t.updated_at <= self.max_age_seconds]
+
+
+class SceneChangeGate:
+    """Cheap static-scene check run before inference.
+    
+    Each frame is reduced to a small grayscale thumbnail and compared with
+    the thumbnail of the last frame that was actually run through the
+    detector. If the mean absolute pixel difference is below diff_threshold
+    and the histogram correlation is at least hist_threshold, the scene is
+    treated as unchanged and the previous detections can be reused. A fresh
+    inference is forced at least every max_static_seconds.
+    """
+    
+    def __init__(self, diff_threshold: float = 4.0, hist_threshold: float = 0.98,
+                 max_static_seconds: float = 2.0, thumbnail_size: tuple = (64, 48)):
+        self.diff_threshold = diff_threshold
+        self.hist_threshold = hist_threshold
+        self.max_static_seconds = max_static_seconds
+        self.thumbnail_size = thumbnail_size
+        self.reset()
+    
+    def reset(self):
+        self.frames_checked = 0
+        self.inferences_saved = 0
+        self.last_difference = 0.0
+        self._reference = None
+        self._reference_hist = None
+        self._reference_at = 0.0
+    
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    
+    def should_infer(self, frame: np.ndarray, timestamp: float) -> bool:
+        """True if the frame differs enough from the last inferred one (or is too old)."""
+        self.frames_checked += 1
+        thumbnail = self._thumbnail(frame)
+        hist = cv2.calcHist([thumbnail], [0], None, [32], [0, 256])
+        
+        if self._reference is not None and timestamp - self._reference_at < self.max_static_seconds:
+            self.last_difference = float(cv2.absdiff(thumbnail, self._reference).mean())
+            correlation = cv2.compareHist(hist, self._reference_hist, cv2.HISTCMP_CORREL)
+            if self.last_difference < self.diff_threshold and correlation >= self.hist_threshold:
+                self.inferences_saved += 1
+                return False
+        
+        self._reference = thumbnail
+        self._reference_hist = hist
+        self._reference_at = timestamp
+        return True
+    
+    def stats(self) -> dict:
+        return {
+            "frames_checked": self.frames_checked,
+            "inferences_saved": self.inferences_saved,
+            "saved_ratio": self.inferences_saved / self.frames_checked if self.frames_checked else 0.0,
+            "last_difference": self.last_difference,
+        }
+
+
+class EcoDispatchGate:
+    """Decides when a live detection is worth an eco-copilot request.
+    
+    A label is dispatched only once it has been the top detection for at
+    least min_frames consecutive updates spanning min_stable_ms. Labels
+    already analysed in the current session are not sent again. Every
+    dispatch gets a new request id; a response whose id is no longer
+    current has been superseded and should be discarded.
+    """
+    
+    def __init__(self, min_frames: int = 5, min_stable_ms: float = 500.0):
+        self.min_frames = min_frames
+        self.min_stable_ms = min_stable_ms
+        self._request_id = 0
+        self._in_flight = None
+        self.reset()
+    
+    def reset(self):
+        """Start a new session: cancel the pending request and forget analysed labels."""
+        self.cancel()
+        self.analysed = set()
+        self.dispatched = 0
+        self.suppressed = 0
+        self.cancelled = 0
+        self._candidate = None
+        self._candidate_frames = 0
+        self._candidate_since = 0.0
+        self._candidate_handled = False
+    
+    def observe(self, label: str, timestamp: float):
+        """Feed the current top label; returns a request id when it should be dispatched."""
+        if label != self._candidate:
+            self._candidate = label
+            self._candidate_frames = 0
+            self._candidate_since = timestamp
+            self._candidate_handled = False
+        self._candidate_frames += 1
+        
+        if label is None or self._candidate_handled or self._candidate_frames < self.min_frames:
+            return None
+        if (timestamp - self._candidate_since) * 1000 < self.min_stable_ms:
+            return None
+        
+        # Each stable run of a label is dispatched or suppressed exactly once
+        self._candidate_handled = True
+        if label in self.analysed:
+            self.suppressed += 1
+            return None
+        
+        self.cancel()
+        self.analysed.add(label)
+        self.dispatched += 1
+        self._in_flight = self._request_id
+        return self._request_id
+    
+    def cancel(self):
+        """Supersede whatever request is in flight."""
+        if self._in_flight is not None:
+            self.cancelled += 1
+            self._in_flight = None
+        self._request_id += 1
+    
+    def is_current(self, request_id: int) -> bool:
+        return request_id is not None and request_id == self._in_flight
+    
+    def finish(self, request_id: int, success: bool = True, label: str = None):
+        """Mark a request done; a failed label may be dispatched again."""
+        if self.is_current(request_id):
+            self._in_flight = None
+        if not success and label is not None:
+            self.analysed.discard(label)
+    
+    def stats(self) -> dict:
+        return {
+            "dispatched": self.dispatched,
+            "suppressed": self.suppressed,
+            "cancelled": self.cancelled,
+            "analysed": sorted(self.analysed),
+        }
+
+
+class InferenceThread(QThread):
+    """Runs the detector as fast as it can on the freshest captured frame."""
+    
+    detection_ready = pyqtSignal(object)  # list of dicts or DetectionResults
+    tracks_ready = pyqtSignal(list)  # confirmed tracks as dicts with 'track_id'
+    
+    def __init__(self, detector, frame_buffer: LatestFrameBuffer,
+                 scheduler: AdaptiveDetectionScheduler = None, tracker: ObjectTracker = None,
+                 gate: SceneChangeGate = None):
+        super().__init__()
+        self.detector = detector
+        self.frame_buffer = frame_buffer
+        self.scheduler = scheduler
+        self.tracker = tracker
+        self.gate = gate
+        self.metrics = detector.metrics
+        self.running = False
+        self.last_detections = []
+    
+    def run(self):
+        """Inference loop."""
+        self.last_detections = []
+        while self.running:
+            frame, captured_at = self.frame_buffer.get(timeout=0.5)
+            if frame is None:
+                continue
+            
+            start = time.perf_counter()
+            if self.gate is not None:
+                infer = self.gate.should_infer(frame, captured_at)
+                start = self.metrics.record("gate", start)
+            else:
+                infer = True
+            
+            if infer:
+                # Unwanted classes such as 'person' are masked out by the detector
+                detections = self.detector.detect(frame)
+                now = self.metrics.record("detect", start)
+                self.metrics.record_ms("frame_age", (now - captured_at) * 1000, now)
+                if self.scheduler is not None:
+                    self.scheduler.record_inference((now - start) * 1000)
+                self.last_detections = detections
+            else:
+                # Static scene: the previous detections still describe it
+                detections = self.last_detections
+            
+            self.detection_ready.emit(detections)
+            if self.tracker is not None:
+                self.tracks_ready.emit(self.tracker.update(detections, captured_at))
+        
+        print("Inference thread stopped")
 
 
 class CameraThread(QThread):
-    """Thread for camera processing."""
+    """Thread for camera capture; detection runs on a separate InferenceThread."""
     
     frame_ready = pyqtSignal(np.ndarray)
-    detection_ready = pyqtSignal(list)
+    detection_ready = pyqtSignal(object)  # list of dicts or DetectionResults
+    tracks_ready = pyqtSignal(list)  # confirmed tracks, after each detector run
     
-    def __init__(self, detector):
+    def __init__(self, detector, scheduler: AdaptiveDetectionScheduler = None,
+                 tracker: ObjectTracker = None, gate: SceneChangeGate = None):
         super().__init__()
         self.detector = detector
+        self.metrics = detector.metrics
+        self.scheduler = scheduler or AdaptiveDetectionScheduler()
+        self.tracker = tracker or ObjectTracker()
+        self.gate = gate or SceneChangeGate()
         self.running = False
         self.cap = None
+        
+        # Capture and inference only share the latest frame
+        self.frame_buffer = LatestFrameBuffer()
+        self.inference_thread = InferenceThread(detector, self.frame_buffer, self.scheduler,
+                                                self.tracker, self.gate)
+        self.inference_thread.detection_ready.connect(self.detection_ready)
+        self.inference_thread.tracks_ready.connect(self.tracks_ready)
     
     def start_camera(self):
         """Start camera capture."""
@@ -977,6 +2801,12 @@ class CameraThread(QThread):
             
             print("Camera opened successfully")
             self.running = True
+            self.frame_buffer.reset()
+            self.scheduler.reset()
+            self.tracker.reset()
+            self.gate.reset()
+            self.inference_thread.running = True
+            self.inference_thread.start()
             self.start()
         else:
             print("Error: Could not open camera")
@@ -985,30 +2815,40 @@ class CameraThread(QThread):
     def stop_camera(self):
         """Stop camera capture."""
         self.running = False
+        self.inference_thread.running = False
+        self.frame_buffer.close()
+        self.inference_thread.wait()
+        self.wait()
         if self.cap:
             self.cap.release()
-        self.wait()
+        
+        if self.scheduler.frames_seen:
+            stats = self.scheduler.stats()
+            print(f"Frames captured: {self.scheduler.frames_seen}, "
+                  f"skipped by scheduler: {self.scheduler.frames_skipped}, "
+                  f"dropped as stale: {self.frame_buffer.frames_dropped}, "
+                  f"final detection interval: {stats['detection_interval']}, "
+                  f"inferences saved by scene gate: {self.gate.inferences_saved}")
     
     def run(self):
-        """Camera processing loop."""
+        """Camera capture loop; paced by the camera itself."""
         frame_count = 0
         
         while self.running and self.cap:
+            start = time.perf_counter()
             ret, frame = self.cap.read()
+            now = self.metrics.record("capture", start)
             if ret and frame is not None:
                 frame_count += 1
                 
-                # Run detection every frame for real-time detection
-                detections = self.detector.detect(frame)
-                
-                # Filter out person detections
-                filtered_detections = [d for d in detections if d['class_name'] != 'person']
-                
-                # Emit signals
+                # Hand the frame to the detector when the scheduler wants a run
+                # (replacing any stale one) and show it immediately, without
+                # waiting for inference
+                if self.scheduler.should_detect(now):
+                    self.frame_buffer.put(frame, now)
                 self.frame_ready.emit(frame)
-                self.detection_ready.emit(filtered_detections)
-            
-            self.msleep(33)  # ~30 FPS
+            else:
+                self.msleep(10)  # Avoid spinning if the camera stops delivering frames
         
         print("Camera thread stopped")
 
@@ -1366,12 +3206,32 @@ class ScanPage(QWidget):
         self.scan_timer = QTimer()
         self.scan_timer.timeout.connect(self.update_scan_status)
         
+        # Polls for the fresh health probe requested by the status button
+        self.status_probe_timer = QTimer()
+        self.status_probe_timer.timeout.connect(self.poll_server_status)
+        self._status_probe_requested = None
+        
+        # Per-stage latency stats for the whole scan pipeline
+        self.metrics = LatencyTracker()
+        self.show_latency_overlay = False
+        
+        # Live detections only reach the chatbot once a label is stable
+        self.eco_dispatch = EcoDispatchGate()
+        
+        # Chatbot calls run off the UI thread; shared with the voice assistant
+        self.llm_executor = LLMRequestExecutor(self)
+        self._eco_stream_started = False
+        
         # Initialize ONNX detector with error handling
         try:
-            self.detector = ONNXYOLOv8Detector("models/yolov8_det_w8a8.onnx")
+            self.detector = ONNXYOLOv8Detector("models/yolov8_det_w8a8.onnx", letterbox=True, autotune=True,
+                                                optimized_cache_dir="cache/optimized_models", io_binding=True,
+                                                excluded_classes=["person"], compact_results=True,
+                                                metrics=self.metrics)
             self.camera_thread = CameraThread(self.detector)
             self.camera_thread.frame_ready.connect(self.update_camera_display)
-            self.camera_thread.detection_ready.connect(self.update_detection_results)
+            # Confirmed tracks carry the detection keys plus a persistent 'track_id'
+            self.camera_thread.tracks_ready.connect(self.update_detection_results)
             print("✅ ONNX detector initialized successfully")
         except Exception as e:
             print(f"❌ ONNX detector initialization failed: {e}")
@@ -1386,6 +3246,12 @@ class ScanPage(QWidget):
             print(f"❌ NPU Chatbot initialization failed: {e}")
             self.npu_chatbot = None
         
+        # Warm the answer cache for products the detector can see, at idle priority
+        self.prewarmer = None
+        if self.npu_chatbot is not None and self.npu_chatbot.cache is not None:
+            self.prewarmer = EcoCachePrewarmer(self.npu_chatbot, ONNXYOLOv8Detector.GROCERY_CLASSES, self.llm_executor)
+            self.prewarmer.start()
+        
         # Initialize text detector for shopping lists with error handling
         try:
             self.text_detector = TextDetector()
@@ -1863,10 +3729,34 @@ class ScanPage(QWidget):
         """)
         self.status_label.setAlignment(Qt.AlignCenter)
         
+        self.overlay_btn = QPushButton("📊 Stats Overlay")
+        self.overlay_btn.setFixedHeight(50)
+        self.overlay_btn.setCheckable(True)
+        self.overlay_btn.setChecked(self.show_latency_overlay)
+        self.overlay_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #607D8B;
+                color: #FFFFFF;
+                border: none;
+                border-radius: 8px;
+                font-size: 16px;
+                font-weight: bold;
+                padding: 0 30px;
+            }
+            QPushButton:hover {
+                background-color: #546E7A;
+            }
+            QPushButton:checked {
+                background-color: #37474F;
+            }
+        """)
+        self.overlay_btn.toggled.connect(self.toggle_latency_overlay)
+        
         controls_layout.addWidget(self.start_btn)
         controls_layout.addWidget(self.stop_btn)
         controls_layout.addWidget(self.test_npu_btn)
         controls_layout.addWidget(self.check_server_btn)
+        controls_layout.addWidget(self.overlay_btn)
         controls_layout.addStretch()
         
         self.scan_layout.addLayout(controls_layout)
@@ -2143,6 +4033,7 @@ class ScanPage(QWidget):
             self.results_text.setPlainText("🔍 Live Detection Starting\n\nInitializing camera and ONNX model...\nEnvironmental impact analysis ready...")
             
             # Start camera thread - this will raise exception if camera fails
+            self.eco_dispatch.reset()
             self.camera_thread.start_camera()
             
         except Exception as e:
@@ -2188,6 +4079,8 @@ class ScanPage(QWidget):
         
         # Stop camera thread
         self.camera_thread.stop_camera()
+        self.eco_dispatch.cancel()
+        print(f"📊 Eco-copilot dispatch: {self.eco_dispatch.stats()}")
         
         # Reset camera view
         self.camera_view.setText("📹 Camera Feed\n\nLive detection stopped.\nClick 'Start Live Detection' to begin again.")
@@ -2221,6 +4114,8 @@ class ScanPage(QWidget):
     def update_camera_display(self, frame):
         """Update the camera display with live video feed"""
         try:
+            start = time.perf_counter()
+            
             # Resize frame to fit label
             height, width = frame.shape[:2]
             max_width = 780
@@ -2232,6 +4127,13 @@ class ScanPage(QWidget):
             
             frame = cv2.resize(frame, (new_width, new_height))
             
+            # Tracked boxes, extrapolated to this frame between detector runs
+            if self.camera_thread is not None:
+                self.draw_tracks(frame, self.camera_thread.tracker.predict(time.perf_counter()), scale)
+            
+            if self.show_latency_overlay:
+                self.draw_latency_overlay(frame)
+            
             # Convert BGR to RGB
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
@@ -2244,9 +4146,50 @@ class ScanPage(QWidget):
             pixmap = QPixmap.fromImage(qt_image)
             self.camera_view.setPixmap(pixmap)
             
+            self.metrics.record("display", start)
+            
         except Exception as e:
             print(f"Error updating camera display: {e}")
     
+    def draw_tracks(self, frame, tracks, scale):
+        """Draw tracked boxes with persistent ids onto a resized BGR frame in place"""
+        for track in tracks:
+            x1, y1, x2, y2 = (int(v * scale) for v in track['bbox'])
+            label = f"#{track['track_id']} {track['class_name']} {track['confidence']:.2f}"
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (80, 175, 76), 2)
+            cv2.putText(frame, label, (x1, max(12, y1 - 6)), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                        (80, 175, 76), 1, cv2.LINE_AA)
+    
+    def toggle_latency_overlay(self, checked):
+        """Show or hide the FPS / latency overlay on the camera feed"""
+        self.show_latency_overlay = checked
+    
+    def draw_latency_overlay(self, frame):
+        """Draw FPS and per-stage p50/p95 latencies onto a BGR frame in place"""
+        lines = []
+        display = self.metrics.stage_stats("display")
+        if display:
+            lines.append(f"Display {display['rate']:.1f} FPS")
+        detect = self.metrics.stage_stats("detect")
+        if detect:
+            lines.append(f"Detect {detect['rate']:.1f} FPS")
+        if self.camera_thread is not None and self.camera_thread.scheduler.frames_seen:
+            cadence = self.camera_thread.scheduler.stats()
+            lines.append(f"Detect every {cadence['detection_interval']} frame(s), "
+                         f"skip {cadence['skip_ratio']:.0%}, CPU {cadence['cpu_usage']:.0%}")
+            gate = self.camera_thread.gate.stats()
+            lines.append(f"Static scene: {gate['inferences_saved']} inferences saved "
+                         f"({gate['saved_ratio']:.0%})")
+        for stage in ("capture", "preprocess", "inference", "postprocess", "frame_age", "display", "eco_copilot"):
+            stats = self.metrics.stage_stats(stage)
+            if stats:
+                lines.append(f"{stage}: p50 {stats['p50']:.1f} / p95 {stats['p95']:.1f} ms")
+        
+        for i, line in enumerate(lines):
+            origin = (10, 22 + i * 20)
+            cv2.putText(frame, line, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(frame, line, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
+    
     def update_detection_results(self, detections):
         """Update detection results in real-time"""
         try:
@@ -2255,7 +4198,8 @@ class ScanPage(QWidget):
                 top_detection = max(detections, key=lambda x: x['confidence'])
                 
                 # Update status
-                self.status_label.setText(f"🔴 LIVE - Top: {top_detection['class_name']} ({top_detection['confidence']:.2f})")
+                track_label = f" #{top_detection['track_id']}" if 'track_id' in top_detection else ""
+                self.status_label.setText(f"🔴 LIVE - Top: {top_detection['class_name']}{track_label} ({top_detection['confidence']:.2f})")
                 self.status_label.setStyleSheet("""
                     QLabel {
                         color: #2E7D32;
@@ -2267,10 +4211,13 @@ class ScanPage(QWidget):
                     }
                 """)
                 
-                # Send to eco-copilot chatbot
-                self.send_to_eco_copilot(top_detection['class_name'])
+                # Send to eco-copilot chatbot once the label has settled
+                request_id = self.eco_dispatch.observe(top_detection['class_name'], time.perf_counter())
+                if request_id is not None:
+                    self.send_to_eco_copilot(top_detection['class_name'], request_id)
                 
             else:
+                self.eco_dispatch.observe(None, time.perf_counter())
                 self.status_label.setText("🔴 LIVE - No objects detected")
                 self.status_label.setStyleSheet("""
                     QLabel {
@@ -2285,8 +4232,13 @@ class ScanPage(QWidget):
         except Exception as e:
             print(f"Error updating detection results: {e}")
     
-    def send_to_eco_copilot(self, product_name):
-        """Send detected product to NPU-optimized eco-copilot chatbot"""
+    def send_to_eco_copilot(self, product_name, request_id=None):
+        """Send detected product to NPU-optimized eco-copilot chatbot
+        
+        The request runs on llm_executor and a newer product cancels an older
+        one. request_id comes from eco_dispatch for live detections; responses
+        to superseded requests are dropped.
+        """
         try:
             # Check if NPU chatbot is available
             if self.npu_chatbot is None:
@@ -2307,24 +4259,67 @@ class ScanPage(QWidget):
             self.results_text.append("⏳ Processing with INT8 quantization...")
             self.results_text.append("")
             
-            # Force UI update
-            QApplication.processEvents()
+            # Send to NPU chatbot without blocking the UI thread; tokens are rendered as they arrive
+            self._eco_stream_started = False
+            self.llm_executor.submit(
+                self._timed_eco_copilot_prompt, product_name, channel="eco_copilot", cancellable=True,
+                on_progress=lambda chunk: self.show_eco_copilot_token(product_name, chunk, request_id),
+                on_result=lambda response: self.show_eco_copilot_response(product_name, response, request_id),
+                on_error=lambda error: self.show_eco_copilot_error(product_name, error, request_id))
             
-            # Send to NPU chatbot
-            response = self.npu_chatbot.send_eco_copilot_prompt(product_name)
-            
-            # Display the response
+        except Exception as e:
+            self.show_eco_copilot_error(product_name, e, request_id)
+    
+    def _timed_eco_copilot_prompt(self, product_name, progress=None, cancel_event=None):
+        """Worker-side chatbot call, recorded as the eco_copilot and eco_copilot_ttft stages"""
+        start = time.perf_counter()
+        first_token = []
+        
+        def on_token(chunk):
+            if not first_token:
+                first_token.append(self.metrics.record("eco_copilot_ttft", start))
+            if progress is not None:
+                progress(chunk)
+        
+        with self.metrics.measure("eco_copilot"):
+            return self.npu_chatbot.send_eco_copilot_prompt(product_name, on_token, cancel_event)
+    
+    def show_eco_copilot_token(self, product_name, chunk, request_id=None):
+        """Append a streamed chunk of the eco-copilot response (runs on the UI thread)"""
+        if request_id is not None and not self.eco_dispatch.is_current(request_id):
+            return
+        if not self._eco_stream_started:
+            self._eco_stream_started = True
             self.results_text.append("🤖 NPU Eco-Copilot Response:")
             self.results_text.append("=" * 50)
-            self.results_text.append(response)
-            self.results_text.append("")
-            self.results_text.append("✅ Analysis complete! Powered by NPU with INT8 optimization")
-            
-        except Exception as e:
-            print(f"Error sending to eco-copilot: {e}")
-            self.results_text.append(f"❌ Error: {str(e)}")
             self.results_text.append("")
-            self.results_text.append("💡 Make sure your NPU model server is running on localhost:3001")
+        self.results_text.moveCursor(QTextCursor.End)
+        self.results_text.insertPlainText(chunk)
+    
+    def show_eco_copilot_response(self, product_name, response, request_id=None):
+        """Display an eco-copilot response (runs on the UI thread)"""
+        if request_id is not None:
+            if not self.eco_dispatch.is_current(request_id):
+                print(f"⚠️ Dropping superseded eco-copilot response for {product_name}")
+                return
+            self.eco_dispatch.finish(request_id)
+        
+        # Display the response, unless it has already been streamed in
+        if not self._eco_stream_started:
+            self.results_text.append("🤖 NPU Eco-Copilot Response:")
+            self.results_text.append("=" * 50)
+            self.results_text.append(response)
+        self.results_text.append("")
+        self.results_text.append("✅ Analysis complete! Powered by NPU with INT8 optimization")
+    
+    def show_eco_copilot_error(self, product_name, error, request_id=None):
+        """Display an eco-copilot failure (runs on the UI thread)"""
+        print(f"Error sending to eco-copilot: {error}")
+        if request_id is not None:
+            self.eco_dispatch.finish(request_id, success=False, label=product_name)
+        self.results_text.append(f"❌ Error: {str(error)}")
+        self.results_text.append("")
+        self.results_text.append("💡 Make sure your NPU model server is running on localhost:3001")
     
     def test_npu_chatbot(self):
         """Test NPU chatbot with a sample product"""
@@ -2333,13 +4328,36 @@ class ScanPage(QWidget):
     
     def check_server_status(self):
         """Check NPU server status and provide instructions"""
+        if self.npu_chatbot is None:
+            self.results_text.clear()
+            self.results_text.append("🔍 NPU Server Status Check")
+            self.results_text.append("=" * 50)
+            self.results_text.append("❌ NPU Chatbot Not Available")
+            return
+        
+        # Show the status the health monitor last saw, then the result of a fresh probe
+        self.show_server_status(self.npu_chatbot.check_server_status())
+        self.results_text.append("")
+        self.results_text.append("⏳ Re-checking server...")
+        self._status_probe_requested = time.monotonic()
+        self.npu_chatbot.health.probe_now()
+        self.status_probe_timer.start(200)
+    
+    def poll_server_status(self):
+        """Show the fresh status once the requested probe has finished"""
+        health = self.npu_chatbot.health
+        # Probes time out after a few seconds; stop waiting well after that
+        timed_out = time.monotonic() - self._status_probe_requested > 15
+        if health.probed_since(self._status_probe_requested) or timed_out:
+            self.status_probe_timer.stop()
+            self.show_server_status(self.npu_chatbot.check_server_status())
+    
+    def show_server_status(self, status):
+        """Display the result of check_server_status"""
         self.results_text.clear()
         self.results_text.append("🔍 NPU Server Status Check")
         self.results_text.append("=" * 50)
         
-        # Check server status
-        status = self.npu_chatbot.check_server_status()
-        
         if status:
             self.results_text.append("✅ NPU Model Server is RUNNING")
             self.results_text.append("✅ Ready for eco-copilot analysis")
@@ -2395,11 +4413,8 @@ class ScanPage(QWidget):
                         self.results_text.append("\n❌ Object detector not available. Please check your setup.")
                         return
                     
-                    # First try object detection
-                    detections = self.detector.detect(image)
-                    
-                    # Filter out person detections
-                    filtered_detections = [d for d in detections if d['class_name'] != 'person']
+                    # First try object detection ('person' is excluded by the detector)
+                    filtered_detections = self.detector.detect(image)
                     
                     if filtered_detections:
                         # Take only the top detection
@@ -2546,39 +4561,74 @@ class ScanPage(QWidget):
         
         items = []
         for i in range(self.shopping_list.count()):
-            items.append(self.shopping_list.item(i).text())
+            # Strip the "🛒 " / "1. " prefixes added when items are listed
+            text = re.sub(r"^[^\w]*(\d+[.)]\s*)?", "", self.shopping_list.item(i).text()).strip()
+            items.append(text or self.shopping_list.item(i).text())
         
         self.results_text.setPlainText(f"🛒 Shopping List Analysis\n\nItems: {len(items)}\n\nEnvironmental Impact Analysis:")
         self.results_text.append("=" * 40)
         
-        # Analyze each item for environmental impact
+        if self.npu_chatbot is None:
+            self.show_shopping_list_analysis(items, [{"item": item, "error": "chatbot not available"} for item in items])
+            return
+        
+        # The whole list goes to the LLM in one or two structured calls
+        self.results_text.append("🤖 Asking the NPU model about the whole list...")
+        self.llm_executor.submit(
+            self._timed_shopping_list_analysis, items, channel="shopping_list", cancellable=True,
+            on_result=lambda results: self.show_shopping_list_analysis(items, results),
+            on_error=lambda error: self.show_shopping_list_analysis(
+                items, [{"item": item, "error": str(error)} for item in items]))
+    
+    def _timed_shopping_list_analysis(self, items, cancel_event=None):
+        """Worker-side list analysis, recorded as the shopping_list stage"""
+        with self.metrics.measure("shopping_list"):
+            return self.npu_chatbot.analyze_shopping_list(items, cancel_event)
+    
+    @staticmethod
+    def keyword_carbon_factor(item):
+        """Rough (kg CO₂e, eco-friendly) guess from keywords, used when the LLM has no answer"""
+        item_lower = item.lower()
+        if any(word in item_lower for word in ['organic', 'local', 'recycled', 'eco', 'green']):
+            return 0.1, True
+        elif any(word in item_lower for word in ['meat', 'beef', 'lamb', 'cheese']):
+            return 1.0, False
+        elif any(word in item_lower for word in ['fish', 'chicken', 'pork']):
+            return 0.5, False
+        elif any(word in item_lower for word in ['vegetables', 'fruits', 'grains', 'beans']):
+            return 0.2, True
+        return 0.3, False  # Default carbon factor
+    
+    def show_shopping_list_analysis(self, items, results):
+        """Display per-item estimates from analyze_shopping_list"""
         eco_friendly_items = 0
         total_carbon = 0
-        
-        for item in items:
-            item_lower = item.lower()
-            carbon_factor = 0.3  # Default carbon factor
-            
-            # Categorize items for better analysis
-            if any(word in item_lower for word in ['organic', 'local', 'recycled', 'eco', 'green']):
-                carbon_factor = 0.1
-                eco_friendly_items += 1
-            elif any(word in item_lower for word in ['meat', 'beef', 'lamb', 'cheese']):
-                carbon_factor = 1.0
-            elif any(word in item_lower for word in ['fish', 'chicken', 'pork']):
-                carbon_factor = 0.5
-            elif any(word in item_lower for word in ['vegetables', 'fruits', 'grains', 'beans']):
-                carbon_factor = 0.2
-                eco_friendly_items += 1
+        estimated = 0
+        
+        self.results_text.append("")
+        for result in results:
+            item = result["item"]
+            if "error" in result:
+                carbon_factor, eco_friendly = self.keyword_carbon_factor(item)
+                estimated += 1
+                self.results_text.append(f"• {item}: {carbon_factor:.1f} kg CO₂e (keyword estimate)")
+            else:
+                carbon_factor, eco_friendly = result["co2e_kg"], result["eco_friendly"]
+                self.results_text.append(f"• {item}: {carbon_factor:.1f} kg CO₂e")
+                if result["alternatives"]:
+                    self.results_text.append(f"   ↳ Try: {', '.join(result['alternatives'])}")
             
             total_carbon += carbon_factor
-            self.results_text.append(f"• {item}: {carbon_factor:.1f} kg CO₂e")
+            eco_friendly_items += eco_friendly
         
         self.results_text.append("=" * 40)
         self.results_text.append(f"📊 Summary:")
         self.results_text.append(f"• Total Carbon Footprint: {total_carbon:.1f} kg CO₂e")
         self.results_text.append(f"• Eco-friendly items: {eco_friendly_items}/{len(items)}")
         self.results_text.append(f"• Sustainability Score: {min(10.0, (eco_friendly_items / len(items)) * 10):.1f}/10")
+        if estimated:
+            errors = {result["error"] for result in results if "error" in result}
+            self.results_text.append(f"⚠️ {estimated} item(s) use keyword estimates: {'; '.join(sorted(errors))}")
         
         if eco_friendly_items / len(items) > 0.7:
             self.results_text.append(f"🌱 Great! Your shopping list is very eco-friendly!")
@@ -2641,6 +4691,23 @@ class EcoCopilotApp(QWidget):
         # Stop camera if running
         if hasattr(self.scan_page, 'camera_thread'):
             self.scan_page.camera_thread.stop_camera()
+        
+        # Drop pending chatbot requests
+        if self.scan_page.prewarmer is not None:
+            self.scan_page.prewarmer.stop()
+        self.scan_page.llm_executor.shutdown()
+        
+        # Dump eco-copilot response cache stats
+        if self.scan_page.npu_chatbot is not None and self.scan_page.npu_chatbot.cache is not None:
+            print(f"📊 Eco response cache: {self.scan_page.npu_chatbot.cache.stats()}")
+            print(f"📊 LLM scheduler: {NPUChatbot.scheduler.stats()}")
+            print(f"📊 LLM backend health: {NPUChatbot.health.stats()}")
+        NPUChatbot.health.stop()
+        
+        # Dump pipeline latency stats
+        if self.scan_page.metrics.stats():
+            print("📊 Scan pipeline latency:")
+            print(self.scan_page.metrics.summary())
         event.accept()
     
     def switch_page(self, page_name):
@@ -2657,18 +4724,25 @@ class EcoCopilotApp(QWidget):
         """Handle recognized voice input"""
         print(f"🎤 Voice recognized: {text}")
         
-        # Get response from NPU chatbot
-        try:
-            response = self.voice_assistant.npu_chatbot.send_eco_copilot_prompt(text)
-            print(f"🤖 Bot response: {response}")
-            
-            # Speak the response
-            self.voice_assistant.speak(response)
-            
-        except Exception as e:
-            error_msg = f"Error getting response: {str(e)}"
-            print(f"❌ {error_msg}")
-            self.voice_assistant.speak("Sorry, I encountered an error. Please try again.")
+        if self.voice_assistant.npu_chatbot is None:
+            self.handle_voice_response_error("chatbot not available")
+            return
+        
+        # Get response from NPU chatbot in the background; a newer utterance cancels this one
+        self.scan_page.llm_executor.submit(self.voice_assistant.npu_chatbot.send_eco_copilot_prompt, text,
+                                           channel="voice", cancellable=True, priority="interactive",
+                                           on_result=self.speak_voice_response,
+                                           on_error=self.handle_voice_response_error)
+    
+    def speak_voice_response(self, response):
+        """Speak a chatbot response to voice input"""
+        print(f"🤖 Bot response: {response}")
+        self.voice_assistant.speak(response)
+    
+    def handle_voice_response_error(self, error):
+        """Handle a failed chatbot request for voice input"""
+        print(f"❌ Error getting response: {str(error)}")
+        self.voice_assistant.speak("Sorry, I encountered an error. Please try again.")
     
     def update_voice_status(self, is_speaking):
         """Update voice status indicator"""
@@ -1,14 +1,17 @@
 import gradio as gr
-import requests
 import yaml
 import asyncio
 import httpx
 import json
+import threading
+
+import http_client
 
 class Chatbot:
     def __init__(self):
         with open("config.yaml", "r") as file:
             config = yaml.safe_load(file)
+        http_client.configure(config)
 
         self.api_key = config["api_key"]
         self.base_url = config["model_server_base_url"]
@@ -27,6 +30,19 @@ class Chatbot:
             "Authorization": "Bearer " + self.api_key
         }
 
+        # One event loop per Gradio worker thread, so the pooled async client
+        # (bound to its loop) keeps its connections between messages
+        self._loops = threading.local()
+
+    def event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Return this thread's persistent event loop, creating it on first use.
+        """
+        loop = getattr(self._loops, "loop", None)
+        if loop is None or loop.is_closed():
+            loop = self._loops.loop = asyncio.new_event_loop()
+        return loop
+
     def chat(self, message: str) -> str:
         """
         Send a chat request in non-streaming mode.
@@ -37,7 +53,7 @@ class Chatbot:
             "sessionId": "example-session-id",
             "attachments": []
         }
-        chat_response = requests.post(
+        chat_response = http_client.get_session().post(
             self.chat_url,
             headers=self.headers,
             json=data
@@ -55,8 +71,7 @@ class Chatbot:
         it streams chat responses in chunks and yields the conversation history.
         """
         response_text = ""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        loop = self.event_loop()
 
         async def async_stream():
             data = {
@@ -67,23 +82,24 @@ class Chatbot:
             }
             buffer = ""
             try:
-                async with httpx.AsyncClient(timeout=self.stream_timeout) as client:
-                    async with client.stream("POST", self.chat_url, headers=self.headers, json=data) as response:
-                        async for chunk in response.aiter_text():
-                            if chunk:
-                                buffer += chunk
-                                # Process each complete line
-                                while "\n" in buffer:
-                                    line, buffer = buffer.split("\n", 1)
-                                    if line.startswith("data: "):
-                                        line = line[len("data: "):]
-                                    try:
-                                        parsed_chunk = json.loads(line.strip())
-                                        yield parsed_chunk.get("textResponse", "")
-                                    except json.JSONDecodeError:
-                                        continue
-                                    except Exception as e:
-                                        yield f"Error processing chunk: {e}"
+                client = http_client.get_async_client()
+                async with client.stream("POST", self.chat_url, headers=self.headers, json=data,
+                                         timeout=self.stream_timeout) as response:
+                    async for chunk in response.aiter_text():
+                        if chunk:
+                            buffer += chunk
+                            # Process each complete line
+                            while "\n" in buffer:
+                                line, buffer = buffer.split("\n", 1)
+                                if line.startswith("data: "):
+                                    line = line[len("data: "):]
+                                try:
+                                    parsed_chunk = json.loads(line.strip())
+                                    yield parsed_chunk.get("textResponse", "")
+                                except json.JSONDecodeError:
+                                    continue
+                                except Exception as e:
+                                    yield f"Error processing chunk: {e}"
             except httpx.RequestError as e:
                 yield f"Streaming chat request failed. Error: {e}"
 
@@ -96,7 +112,8 @@ class Chatbot:
         except StopAsyncIteration:
             pass
         finally:
-            loop.close()
+            # Keep the loop (and its pooled connections) for the next message
+            loop.run_until_complete(agen.aclose())
         yield response_text
 
 def main():
@@ -0,0 +1,150 @@
+"""
+Shared HTTP transport for all model-server traffic.
+
+Every entry point (the Qt app, the Gradio and terminal chatbots, auth.py,
+workspaces.py and debug_app.py) goes through the clients here instead of
+calling requests.get/post or opening a fresh httpx.AsyncClient per message,
+so connections to the AnythingLLM server stay alive and are reused.
+
+    - get_session():      pooled requests.Session for synchronous callers
+    - get_async_client(): pooled httpx.AsyncClient for the running event loop
+
+Pool sizes can be set from config.yaml with the optional keys
+http_pool_size, http_max_connections, http_keepalive_expiry and http2.
+"""
+import asyncio
+import threading
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_SETTINGS = {
+    "pool_size": 10,            # keep-alive connections per host
+    "max_connections": 20,      # async: total connections across hosts
+    "keepalive_expiry": 30.0,   # async: seconds an idle connection is kept
+    "http2": True,              # used when the h2 package is installed
+}
+
+_lock = threading.Lock()
+_settings = dict(DEFAULT_SETTINGS)
+_session = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+_retired = weakref.WeakKeyDictionary()        # event loop -> clients replaced by configure(), not yet closed
+_closing = set()                              # aclose() tasks in progress (the loop only holds weak references)
+
+
+def configure(config: dict = None, **overrides) -> dict:
+    """
+    Set pool sizes and protocol options; existing clients are closed and rebuilt lazily.
+
+    Inputs:
+        - config (dict): optional parsed config.yaml; http_* keys are read from it
+        - overrides: pool_size, max_connections, keepalive_expiry or http2
+    """
+    global _session
+    config = config or {}
+    settings = dict(DEFAULT_SETTINGS)
+    for key in DEFAULT_SETTINGS:
+        config_key = key if key == "http2" else f"http_{key}"
+        if config_key in config:
+            settings[key] = config[config_key]
+    settings.update(overrides)
+
+    with _lock:
+        if settings == _settings:
+            return dict(_settings)
+        _settings.update(settings)
+        old_session, _session = _session, None
+        # Async clients belong to their loops: retire them to be closed there and rebuilt on next use
+        for loop, client in _async_clients.items():
+            _retired.setdefault(loop, []).append(client)
+        _async_clients.clear()
+        retired_loops = list(_retired.keys())
+    if old_session is not None:
+        old_session.close()
+    for loop in retired_loops:
+        if loop.is_closed():
+            # Its connections went with the loop
+            with _lock:
+                _retired.pop(loop, None)
+        elif loop.is_running():
+            loop.call_soon_threadsafe(_close_retired, loop)
+        # An idle loop closes them the next time it asks for its client
+    return dict(_settings)
+
+
+def _close_retired(loop) -> None:
+    """Close clients retired by configure() for loop; call on that loop's thread while it runs."""
+    with _lock:
+        clients = _retired.pop(loop, [])
+    for client in clients:
+        task = loop.create_task(client.aclose())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+
+def get_session() -> requests.Session:
+    """Process-wide requests.Session with a keep-alive connection pool."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_settings["pool_size"],
+                                  pool_maxsize=_settings["pool_size"])
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Pooled httpx.AsyncClient for the running event loop.
+
+    httpx connections are bound to the loop that opened them, so each loop gets
+    its own client; callers should keep one loop alive across requests to
+    benefit from reuse. HTTP/2 is negotiated when h2 is installed and the
+    server supports it. Pass timeouts per request.
+    """
+    loop = asyncio.get_running_loop()
+    if loop in _retired:
+        _close_retired(loop)
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            limits = httpx.Limits(max_connections=_settings["max_connections"],
+                                  max_keepalive_connections=_settings["pool_size"],
+                                  keepalive_expiry=_settings["keepalive_expiry"])
+            client = httpx.AsyncClient(limits=limits,
+                                       http2=bool(_settings["http2"]) and HTTP2_AVAILABLE)
+            _async_clients[loop] = client
+        return client
+
+
+def close() -> None:
+    """Close the shared sync session (async clients close with aclose())."""
+    global _session
+    with _lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+
+
+async def aclose() -> None:
+    """Close the async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+        retired = _retired.pop(loop, [])
+    for old_client in retired:
+        await old_client.aclose()
+    if client is not None:
+        await client.aclose()
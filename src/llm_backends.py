@@ -0,0 +1,803 @@
+"""
+Pluggable LLM backends behind one interface.
+
+    - AnythingLLMBackend: AnythingLLM workspace chat (NPU model server)
+    - OllamaBackend:      Ollama /api/generate
+    - InProcessBackend:   a local engine object with generate()/stream()
+    - LLMScheduler:       per-backend concurrency limit with priority queues (RequestPriority)
+    - HealthMonitor:      background probes with backoff driving a CircuitBreaker per backend
+    - BackendRouter:      health-aware failover and optional hedging over the above
+
+Every backend streams text chunks and raises LLMBackendError on failure, so
+callers get the same behaviour and error type whichever model answers.
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+
+import requests
+
+import http_client
+
+
+class LLMBackendError(Exception):
+    """A backend could not produce a response."""
+
+
+class LLMRequestShed(LLMBackendError):
+    """The scheduler dropped a queued request before it reached the backend."""
+
+
+class LLMBackend:
+    """Base class: implement stream(); generate() and available() come for free."""
+
+    name = "backend"
+
+    def stream(self, prompt: str, cancel_event: threading.Event = None, timeout: float = None):
+        """
+        Yield response text chunks as they arrive; stop once cancel_event is set.
+
+        timeout (seconds) overrides the backend's default read timeout.
+        """
+        raise NotImplementedError
+
+    def generate(self, prompt: str, cancel_event: threading.Event = None, timeout: float = None) -> str:
+        """Whole response text."""
+        return "".join(self.stream(prompt, cancel_event, timeout))
+
+    def available(self) -> bool:
+        """Cheap reachability check."""
+        return True
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name})"
+
+
+class AnythingLLMBackend(LLMBackend):
+    """AnythingLLM workspace chat, streamed over SSE or as one blocking reply."""
+
+    name = "anythingllm"
+
+    def __init__(self, base_url: str, api_key: str, workspace_slug: str, stream: bool = True,
+                 stream_timeout: float = 60, timeout: float = 15, session_id: str = "eco-copilot-session"):
+        self.base_url = base_url
+        self.workspace_slug = workspace_slug
+        self.use_stream = stream
+        self.stream_timeout = stream_timeout
+        self.timeout = timeout
+        self.session_id = session_id
+        self.headers = {
+            "accept": "application/json",
+            "Content-Type": "application/json",
+            "Authorization": "Bearer " + api_key
+        }
+
+    @classmethod
+    def from_config(cls, config: dict):
+        return cls(config["model_server_base_url"], config["api_key"], config["workspace_slug"],
+                   stream=config.get("stream", True), stream_timeout=config.get("stream_timeout", 60))
+
+    def _payload(self, prompt):
+        return {"message": prompt, "mode": "chat", "sessionId": self.session_id, "attachments": []}
+
+    def stream(self, prompt, cancel_event=None, timeout=None):
+        if not self.use_stream:
+            yield self._blocking(prompt, timeout or self.timeout)
+            return
+
+        url = f"{self.base_url}/workspace/{self.workspace_slug}/stream-chat"
+        try:
+            with http_client.get_session().post(url, headers=self.headers, json=self._payload(prompt),
+                                                stream=True, timeout=(5, timeout or self.stream_timeout)) as response:
+                if response.status_code != 200:
+                    raise LLMBackendError(f"NPU Model Error: {response.status_code} - {response.text}")
+
+                # text/event-stream comes without a charset, which requests would decode as ISO-8859-1
+                response.encoding = "utf-8"
+                # chunk_size=None hands over each chunk as soon as the server flushes it
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    if not line or not line.startswith("data:"):
+                        continue
+                    try:
+                        parsed_chunk = json.loads(line[len("data:"):].strip())
+                    except json.JSONDecodeError:
+                        continue
+
+                    if parsed_chunk.get("error"):
+                        raise LLMBackendError(f"NPU Model Error: {parsed_chunk['error']}")
+                    text = parsed_chunk.get("textResponse") or ""
+                    if text:
+                        yield text
+                    if parsed_chunk.get("close", False):
+                        return
+        except requests.exceptions.RequestException as e:
+            raise LLMBackendError(f"Connection Error: {e}") from e
+
+    def _blocking(self, prompt, timeout):
+        url = f"{self.base_url}/workspace/{self.workspace_slug}/chat"
+        try:
+            response = http_client.get_session().post(url, headers=self.headers, json=self._payload(prompt),
+                                                      timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            raise LLMBackendError(f"Connection Error: {e}") from e
+
+        if response.status_code != 200:
+            raise LLMBackendError(f"NPU Model Error: {response.status_code} - {response.text}")
+        try:
+            response_data = response.json()
+        except ValueError:
+            raise LLMBackendError("Response is not valid JSON")
+        if response_data.get("error"):
+            raise LLMBackendError(f"NPU Model Error: {response_data['error']}")
+        if "textResponse" not in response_data:
+            raise LLMBackendError(f"Unexpected response format: {response_data}")
+        return response_data["textResponse"]
+
+    def available(self):
+        session = http_client.get_session()
+        try:
+            # Try to connect to the server using the API endpoint
+            response = session.get(f"{self.base_url}/workspace/{self.workspace_slug}",
+                                   headers=self.headers, timeout=5)
+            return response.status_code == 200
+        except Exception:
+            try:
+                # Fallback: try the root endpoint
+                response = session.get(f"{self.base_url.replace('/api/v1', '')}/", timeout=5)
+                return response.status_code == 200
+            except Exception:
+                return False
+
+
+class OllamaBackend(LLMBackend):
+    """Ollama /api/generate, streamed as newline-delimited JSON."""
+
+    name = "ollama"
+
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama2:7b-chat",
+                 timeout: float = 120):
+        # Accept the full generate URL as well (OLLAMA_URL in green_len_2_integrated)
+        self.base_url = base_url.rstrip("/").removesuffix("/api/generate")
+        self.model = model
+        self.timeout = timeout
+
+    def stream(self, prompt, cancel_event=None, timeout=None):
+        payload = {"model": self.model, "prompt": prompt, "stream": True}
+        try:
+            with http_client.get_session().post(f"{self.base_url}/api/generate", json=payload, stream=True,
+                                                timeout=(5, timeout or self.timeout)) as response:
+                if response.status_code != 200:
+                    raise LLMBackendError(f"Ollama Error: {response.status_code} - {response.text}")
+                response.encoding = "utf-8"
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    if not line:
+                        continue
+                    try:
+                        parsed_chunk = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if parsed_chunk.get("error"):
+                        raise LLMBackendError(f"Ollama Error: {parsed_chunk['error']}")
+                    if parsed_chunk.get("response"):
+                        yield parsed_chunk["response"]
+                    if parsed_chunk.get("done"):
+                        return
+        except requests.exceptions.RequestException as e:
+            raise LLMBackendError(f"Error contacting Ollama: {e}") from e
+
+    def available(self):
+        try:
+            return http_client.get_session().get(f"{self.base_url}/api/tags", timeout=2).status_code == 200
+        except Exception:
+            return False
+
+
+class InProcessBackend(LLMBackend):
+    """A model running inside this process, e.g. an NPU engine object.
+
+    The engine needs generate(prompt) -> str; if it also has stream(prompt)
+    yielding text, that is used instead.
+    """
+
+    name = "in-process"
+
+    def __init__(self, engine=None):
+        self.engine = engine
+
+    @classmethod
+    def load(cls):
+        """Wrap engine.Engine if the package is installed, else an unavailable backend."""
+        try:
+            from engine import Engine
+            return cls(Engine())
+        except Exception:
+            return cls(None)
+
+    def stream(self, prompt, cancel_event=None, timeout=None):
+        if self.engine is None:
+            raise LLMBackendError("NPU backend not available")
+        try:
+            if hasattr(self.engine, "stream"):
+                for chunk in self.engine.stream(prompt):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    yield chunk
+            else:
+                yield self.engine.generate(prompt)
+        except LLMBackendError:
+            raise
+        except Exception as e:
+            raise LLMBackendError(f"NPU error: {e}") from e
+
+    def available(self):
+        return self.engine is not None
+
+
+class RequestPriority:
+    """A request's scheduler class that may be raised while the request waits.
+
+    Used when callers share one coalesced request: each joiner raises it to
+    its own class, so the shared request queues as the most urgent of them.
+    """
+
+    def __init__(self, priority: str = "interactive"):
+        if priority not in LLMScheduler.PRIORITIES:
+            raise ValueError(f"Unknown request priority: {priority}")
+        self.value = priority
+
+    def raise_to(self, priority: str):
+        rank = LLMScheduler.PRIORITIES.index
+        if rank(priority) < rank(self.value):
+            self.value = priority
+
+    def __repr__(self):
+        return self.value
+
+
+class LLMScheduler:
+    """Admits requests to each backend by priority, within a concurrency limit.
+
+    Waiting requests are admitted in PRIORITIES order (FIFO within a class),
+    so interactive chat only ever waits for requests already running. Each
+    class has a bounded queue: when it is full the oldest waiting request of
+    that class is shed, as the newer one supersedes it. Queued requests are
+    also dropped when their caller cancels or they wait longer than the
+    class's max_wait seconds. A request's class is re-read while it waits,
+    so a RequestPriority raised in the meantime takes effect.
+    """
+
+    PRIORITIES = ("interactive", "scan", "batch", "prefetch")
+    DEFAULT_QUEUE_LIMITS = {"interactive": None, "scan": 4, "batch": 8, "prefetch": 2}
+    DEFAULT_MAX_WAIT = {"interactive": None, "scan": 30, "batch": None, "prefetch": 60}
+
+    class _Ticket:
+        __slots__ = ("handle", "order", "enqueued", "shed")
+
+        def __init__(self, handle, order):
+            self.handle = handle
+            self.order = order
+            self.enqueued = time.monotonic()
+            self.shed = False
+
+        @property
+        def priority(self):
+            return self.handle.value
+
+    def __init__(self, limits: dict = None, default_limit: int = 1, queue_limits: dict = None,
+                 max_wait: dict = None):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._active = {}    # backend name -> running requests
+        self._waiting = {}   # backend name -> [_Ticket]
+        self._order = itertools.count()
+        self.counters = {priority: {"admitted": 0, "shed": 0, "expired": 0, "cancelled": 0}
+                         for priority in self.PRIORITIES}
+        self.limits = {}
+        self.default_limit = 1
+        self.configure(limits=limits, default_limit=default_limit, queue_limits=queue_limits, max_wait=max_wait)
+
+    def configure(self, config: dict = None, limits: dict = None, default_limit: int = None,
+                  queue_limits: dict = None, max_wait: dict = None):
+        """
+        Set limits; config.yaml keys llm_concurrency (number, or per-backend
+        mapping), llm_queue_limits and llm_max_wait are read when config is given.
+        """
+        config = config or {}
+        concurrency = config.get("llm_concurrency")
+        if isinstance(concurrency, dict):
+            limits = concurrency
+        elif concurrency is not None:
+            default_limit = concurrency
+        with self._lock:
+            if limits is not None:
+                self.limits = dict(limits)
+            if default_limit is not None:
+                self.default_limit = max(1, int(default_limit))
+            self.queue_limits = dict(self.DEFAULT_QUEUE_LIMITS, **(queue_limits or config.get("llm_queue_limits") or {}))
+            self.max_wait = dict(self.DEFAULT_MAX_WAIT, **(max_wait or config.get("llm_max_wait") or {}))
+            self._changed.notify_all()
+
+    def limit(self, backend_name: str) -> int:
+        return self.limits.get(backend_name, self.default_limit)
+
+    def acquire(self, backend_name: str, priority="interactive", cancel_event: threading.Event = None):
+        """
+        Block until the request may run on backend_name; raises LLMRequestShed if it is dropped.
+
+        priority is a class name or a RequestPriority that may be raised while waiting.
+        """
+        handle = priority if isinstance(priority, RequestPriority) else RequestPriority(priority)
+        ticket = self._Ticket(handle, next(self._order))
+        priority = ticket.priority
+        rank = self.PRIORITIES.index
+        with self._lock:
+            waiting = self._waiting.setdefault(backend_name, [])
+            same_class = [other for other in waiting if other.priority == priority]
+            queue_limit = self.queue_limits.get(priority)
+            if queue_limit is not None and len(same_class) >= queue_limit:
+                oldest = min(same_class, key=lambda other: other.order)
+                oldest.shed = True
+                waiting.remove(oldest)
+            waiting.append(ticket)
+
+            outcome = None
+            while outcome is None:
+                priority = ticket.priority
+                max_wait = self.max_wait.get(priority)
+                if ticket.shed:
+                    outcome = "shed"
+                elif cancel_event is not None and cancel_event.is_set():
+                    outcome = "cancelled"
+                elif max_wait is not None and time.monotonic() - ticket.enqueued > max_wait:
+                    outcome = "expired"
+                elif (self._active.get(backend_name, 0) < self.limit(backend_name) and
+                      min(waiting, key=lambda other: (rank(other.priority), other.order)) is ticket):
+                    waiting.remove(ticket)
+                    self._active[backend_name] = self._active.get(backend_name, 0) + 1
+                    outcome = "admitted"
+                else:
+                    self._changed.wait(0.05)
+
+            self.counters[priority][outcome] += 1
+            if outcome == "admitted":
+                return
+            if ticket in waiting:
+                waiting.remove(ticket)
+            self._changed.notify_all()
+        reasons = {"shed": "queue full, superseded by a newer request",
+                   "cancelled": "caller went away",
+                   "expired": f"waited more than {self.max_wait.get(priority)} s"}
+        raise LLMRequestShed(f"{priority} request to {backend_name} dropped: {reasons[outcome]}")
+
+    def release(self, backend_name: str):
+        with self._lock:
+            self._active[backend_name] = max(0, self._active.get(backend_name, 0) - 1)
+            self._changed.notify_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": dict(self._active),
+                "queued": {name: len(waiting) for name, waiting in self._waiting.items()},
+                "by_priority": {priority: dict(counts) for priority, counts in self.counters.items()},
+            }
+
+
+class CircuitBreaker:
+    """Fails requests to a backend fast while it is known to be down.
+
+    closed: requests flow. After failure_threshold consecutive failures the
+    breaker opens and allow() returns False for reset_timeout seconds, which
+    doubles (up to max_reset_timeout) each time it reopens. Then it is
+    half-open: one trial request is let through per reset_timeout, and its
+    outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 1, reset_timeout: float = 5, max_reset_timeout: float = 120):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._reset_timeout = reset_timeout
+        self._opened_at = None
+        self._trial_at = None
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return "closed"
+        return "open" if now - self._opened_at < self._reset_timeout else "half-open"
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker next lets a request through."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self._reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            if state == "closed":
+                return True
+            if state == "half-open" and (self._trial_at is None or now - self._trial_at > self._reset_timeout):
+                self._trial_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = self._trial_at = None
+            self._reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None:
+                # A failed trial (or probe) while open: back off further
+                self._reset_timeout = min(self._reset_timeout * 2, self.max_reset_timeout)
+            elif self._failures < self.failure_threshold:
+                return
+            else:
+                self.trips += 1
+            self._opened_at = now
+            self._trial_at = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self._state(time.monotonic()), "trips": self.trips, "rejected": self.rejected}
+
+
+class HealthMonitor:
+    """Probes backends on a background thread and caches their status.
+
+    A healthy backend is probed every interval seconds; a failing one with
+    exponential backoff from min_backoff up to max_backoff. Probe results
+    feed each backend's CircuitBreaker, so requests fail fast while a
+    backend is down and resume as soon as a probe sees it again. Backends
+    are tracked by name, so routers sharing a monitor probe each server once.
+    """
+
+    class _Watched:
+        __slots__ = ("backend", "breaker", "status", "checked_at", "backoff", "next_probe")
+
+        def __init__(self, backend, breaker, backoff):
+            self.backend = backend
+            self.breaker = breaker
+            self.status = None       # result of the last probe, None before the first
+            self.checked_at = None   # monotonic time of the last probe
+            self.backoff = backoff   # delay before the next probe if this one fails
+            self.next_probe = 0.0
+
+    def __init__(self, interval: float = 30, min_backoff: float = 1, max_backoff: float = 60,
+                 failure_threshold: int = 1):
+        self.interval = interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._watched = {}   # backend name -> _Watched
+        self.probes = 0
+
+    def configure(self, config: dict = None):
+        """Read health_check_interval and health_max_backoff from config.yaml."""
+        config = config or {}
+        self.interval = config.get("health_check_interval", self.interval)
+        self.max_backoff = config.get("health_max_backoff", self.max_backoff)
+
+    def watch(self, backend: LLMBackend) -> CircuitBreaker:
+        """Start probing backend (first probe right away); returns its breaker."""
+        with self._lock:
+            entry = self._watched.get(backend.name)
+            if entry is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.min_backoff * 5, self.max_backoff * 2)
+                entry = self._watched[backend.name] = self._Watched(backend, breaker, self.min_backoff)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name="llm-health", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return entry.breaker
+
+    def breaker(self, backend: LLMBackend) -> CircuitBreaker:
+        with self._lock:
+            entry = self._watched.get(backend.name)
+        return entry.breaker if entry is not None else self.watch(backend)
+
+    def status(self, backend: LLMBackend):
+        """(available, seconds since the last probe); available is None before the first probe."""
+        with self._lock:
+            entry = self._watched.get(backend.name)
+            if entry is None or entry.checked_at is None:
+                return None, None
+            return entry.status, time.monotonic() - entry.checked_at
+
+    def probe_now(self):
+        """Ask the monitor thread to re-probe every backend without waiting for the schedule."""
+        with self._lock:
+            for entry in self._watched.values():
+                entry.next_probe = 0.0
+        self._wake.set()
+
+    def probed_since(self, since: float) -> bool:
+        """True once every backend has finished a probe after monotonic time since."""
+        with self._lock:
+            return all(entry.checked_at is not None and entry.checked_at >= since
+                       for entry in self._watched.values())
+
+    def _probe(self, entry):
+        backend, breaker, previous = entry.backend, entry.breaker, entry.status
+        ok = bool(backend.available())
+        now = time.monotonic()
+        with self._lock:
+            self.probes += 1
+            entry.status, entry.checked_at = ok, now
+            if ok:
+                entry.backoff = self.min_backoff
+                entry.next_probe = now + self.interval
+            else:
+                entry.next_probe = now + entry.backoff
+                entry.backoff = min(entry.backoff * 2, self.max_backoff)
+            retry = entry.next_probe - now
+        if ok:
+            breaker.record_success()
+            if previous is False:
+                print(f"✅ LLM backend {backend.name} is back up")
+        else:
+            breaker.record_failure()
+            if previous is not False:
+                print(f"⚠️ LLM backend {backend.name} is not responding; retrying with backoff (next in {retry:.0f} s)")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [entry for entry in self._watched.values() if entry.next_probe <= now]
+            for entry in due:
+                if self._stop_event.is_set():
+                    return
+                self._probe(entry)
+            with self._lock:
+                next_probe = min((entry.next_probe for entry in self._watched.values()), default=now + self.interval)
+            self._wake.wait(max(0.0, next_probe - time.monotonic()))
+            self._wake.clear()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._watched.items())
+            probes = self.probes
+        return {
+            "probes": probes,
+            "backends": {name: dict(entry.breaker.stats(), up=entry.status) for name, entry in entries},
+        }
+
+
+class BackendRouter(LLMBackend):
+    """Routes each request to the first healthy backend, failing over on error.
+
+    A backend that fails (error, or no first token within first_token_timeout
+    seconds) trips its circuit breaker and is skipped until the health
+    monitor or a trial request sees it again; when every breaker is open
+    requests fail immediately. With hedge_after_ms set,
+    a request that has produced no token by then is also started on the next
+    backend; whichever answers first wins and the other is cancelled.
+    Failover only happens before the first token: once text has been streamed
+    a mid-response failure is raised to the caller.
+    """
+
+    name = "router"
+
+    def __init__(self, backends: list, hedge_after_ms: float = None, first_token_timeout: float = 60,
+                 scheduler: LLMScheduler = None, monitor: HealthMonitor = None):
+        self.backends = list(backends)
+        # Routers that share a scheduler / monitor share each backend's limits and breaker
+        self.scheduler = scheduler or LLMScheduler()
+        self.monitor = monitor or HealthMonitor()
+        for backend in self.backends:
+            self.monitor.watch(backend)
+        self.hedge_after_ms = hedge_after_ms
+        self.first_token_timeout = first_token_timeout
+        self.last_backend = None
+        self.failovers = 0
+        self.hedges = 0
+
+    @classmethod
+    def from_config(cls, config: dict, scheduler: LLMScheduler = None, monitor: HealthMonitor = None):
+        """
+        Build the router from config.yaml.
+
+        Optional keys: llm_backends (order, default [anythingllm]), ollama_url,
+        ollama_model, hedge_after_ms, first_token_timeout.
+        """
+        backends = []
+        for name in config.get("llm_backends", ["anythingllm"]):
+            if name == "anythingllm":
+                backends.append(AnythingLLMBackend.from_config(config))
+            elif name == "ollama":
+                backends.append(OllamaBackend(config.get("ollama_url", "http://localhost:11434"),
+                                              config.get("ollama_model", "llama2:7b-chat")))
+            elif name == "in-process":
+                backends.append(InProcessBackend.load())
+            else:
+                print(f"⚠️ Unknown LLM backend in config: {name}")
+        return cls(backends, hedge_after_ms=config.get("hedge_after_ms"),
+                   first_token_timeout=config.get("first_token_timeout", config.get("stream_timeout", 60)),
+                   scheduler=scheduler, monitor=monitor)
+
+    def ordered_backends(self) -> list:
+        """Backends whose circuit breaker lets a request through, in configured order."""
+        return [backend for backend in self.backends if self.monitor.breaker(backend).allow()]
+
+    def available(self):
+        """Cached: true unless every backend's breaker is open. Never blocks on the network."""
+        return any(self.monitor.breaker(backend).state != "open" for backend in self.backends)
+
+    def _mark_failed(self, backend, error):
+        print(f"⚠️ LLM backend {backend.name} failed: {error}")
+        self.monitor.breaker(backend).record_failure()
+
+    def _mark_ok(self, backend):
+        self.monitor.breaker(backend).record_success()
+
+    def generate(self, prompt, cancel_event=None, timeout=None, priority="interactive"):
+        return "".join(self.stream(prompt, cancel_event, timeout, priority))
+
+    def stream(self, prompt, cancel_event=None, timeout=None, priority="interactive"):
+        """
+        Stream from the first healthy backend that answers.
+
+        priority is an LLMScheduler class or RequestPriority; timeouts count from when the
+        scheduler admits the request, not from when it was queued.
+        """
+        if not self.backends:
+            raise LLMBackendError("No LLM backend configured")
+        candidates = self.ordered_backends()
+        if not candidates:
+            retry_in = min(self.monitor.breaker(backend).retry_in() for backend in self.backends)
+            raise LLMBackendError(f"Model server unavailable (circuit open, retrying in {retry_in:.0f} s)")
+        first_token_timeout = timeout or self.first_token_timeout
+
+        events = queue.Queue()
+        attempts = []  # [backend, cancel event, started at, finished, launched at]
+
+        def pump(index, backend, attempt_cancel):
+            try:
+                self.scheduler.acquire(backend.name, priority, attempt_cancel)
+            except LLMRequestShed as e:
+                events.put((index, "shed", e))
+                return
+            try:
+                events.put((index, "started", None))
+                for chunk in backend.stream(prompt, attempt_cancel, timeout):
+                    if attempt_cancel.is_set():
+                        return
+                    events.put((index, "chunk", chunk))
+                events.put((index, "done", None))
+            except Exception as e:
+                events.put((index, "error", e))
+            finally:
+                self.scheduler.release(backend.name)
+
+        def launch():
+            backend = candidates[len(attempts)]
+            attempt_cancel = threading.Event()
+            # started at stays None while the attempt is queued in the scheduler
+            attempts.append([backend, attempt_cancel, None, False, time.monotonic()])
+            threading.Thread(target=pump, args=(len(attempts) - 1, backend, attempt_cancel), daemon=True).start()
+
+        def finish(index):
+            attempts[index][3] = True
+            attempts[index][1].set()
+
+        winner = None
+        errors = []
+        all_shed = True
+        launch()
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                try:
+                    index, kind, payload = events.get(timeout=0.05)
+                except queue.Empty:
+                    index, kind, payload = None, None, None
+
+                if index is not None and attempts[index][3]:
+                    continue  # a cancelled loser
+                if winner is not None and index not in (None, winner):
+                    continue
+                if kind == "started":
+                    attempts[index][2] = time.monotonic()
+
+                if kind in ("chunk", "done"):
+                    if winner is None:
+                        winner = index
+                        self.last_backend = attempts[index][0]
+                        self._mark_ok(self.last_backend)
+                        for other in range(len(attempts)):
+                            if other != index:
+                                finish(other)
+                    if kind == "done":
+                        return
+                    yield payload
+                    continue
+
+                if kind == "error":
+                    finish(index)
+                    self._mark_failed(attempts[index][0], payload)
+                    if winner is not None:
+                        raise LLMBackendError(f"{attempts[index][0].name} failed mid-response: {payload}")
+                    errors.append(f"{attempts[index][0].name}: {payload}")
+                    all_shed = False
+
+                if kind == "shed":
+                    # Not the backend's fault: no cooldown, but try the next one
+                    finish(index)
+                    errors.append(str(payload))
+
+                if winner is None:
+                    now = time.monotonic()
+                    for attempt_index, (backend, _, started, finished, _) in enumerate(attempts):
+                        if not finished and started is not None and now - started > first_token_timeout:
+                            finish(attempt_index)
+                            self._mark_failed(backend, f"no response within {first_token_timeout:.0f} s")
+                            errors.append(f"{backend.name}: timed out")
+                            all_shed = False
+
+                    live = [attempt for attempt in attempts if not attempt[3]]
+                    hedge_due = (self.hedge_after_ms is not None and len(live) == 1 and len(attempts) == 1 and
+                                 (now - live[0][4]) * 1000 > self.hedge_after_ms)
+                    if len(attempts) < len(candidates) and (not live or hedge_due):
+                        if live:
+                            self.hedges += 1
+                            print(f"⏱️ No token from {live[0][0].name} after {self.hedge_after_ms:.0f} ms, "
+                                  f"hedging with {candidates[len(attempts)].name}")
+                        else:
+                            self.failovers += 1
+                            print(f"🔁 Failing over to {candidates[len(attempts)].name}")
+                        launch()
+                    elif not live:
+                        if all_shed:
+                            raise LLMRequestShed("; ".join(errors))
+                        raise LLMBackendError("All LLM backends failed: " + "; ".join(errors))
+        finally:
+            for attempt_index in range(len(attempts)):
+                if attempt_index != winner:
+                    finish(attempt_index)
+            if winner is not None:
+                # Let the winner's stream stop too if the caller stopped reading
+                attempts[winner][1].set()
+
+    def stats(self) -> dict:
+        return {
+            "backends": [backend.name for backend in self.backends],
+            "health": self.monitor.stats(),
+            "last_backend": self.last_backend.name if self.last_backend else None,
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "scheduler": self.scheduler.stats(),
+        }
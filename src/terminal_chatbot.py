@@ -1,12 +1,13 @@
 import asyncio
 import httpx
 import json
-import requests
 import sys
 import threading
 import time
 import yaml
 
+import http_client
+
 
 def loading_indicator() -> None:
     """
@@ -25,6 +26,7 @@ class Chatbot:
     def __init__(self):
         with open("config.yaml", "r") as file:
             config = yaml.safe_load(file)
+        http_client.configure(config)
 
         self.api_key = config["api_key"]
         self.base_url = config["model_server_base_url"]
@@ -43,6 +45,10 @@ class Chatbot:
             "Authorization": "Bearer " + self.api_key
         }
 
+        # A single event loop for the whole session keeps the pooled async
+        # client (and its open connections) alive between messages
+        self.loop = asyncio.new_event_loop()
+
     def run(self) -> None:
         """
         Run the chat application loop. The user can type messages to chat with the assistant.
@@ -87,7 +93,7 @@ class Chatbot:
             "attachments": []
         }
 
-        chat_response = requests.post(
+        chat_response = http_client.get_session().post(
             self.chat_url,
             headers=self.headers,
             json=data
@@ -110,7 +116,7 @@ class Chatbot:
         """
         Wrapper to run the asynchronous streaming chat.
         """
-        asyncio.run(self.streaming_chat_async(message))
+        self.loop.run_until_complete(self.streaming_chat_async(message))
 
     async def streaming_chat_async(self, message: str) -> None:
         """
@@ -127,30 +133,31 @@ class Chatbot:
 
         buffer = ""
         try:
-            async with httpx.AsyncClient(timeout=self.stream_timeout) as client:
-                async with client.stream("POST", self.chat_url, headers=self.headers, json=data) as response:
-                    print("Agent: ", end="")
-                    async for chunk in response.aiter_text():
-                        if chunk:
-                            buffer += chunk
-                            # Process each complete line
-                            while "\n" in buffer:
-                                line, buffer = buffer.split("\n", 1)
-                                if line.startswith("data: "):
-                                    line = line[len("data: "):]
-                                try:
-                                    parsed_chunk = json.loads(line.strip())
-                                    print(parsed_chunk.get("textResponse", ""), end="", flush=True)
-
-                                    if parsed_chunk.get("close", False):
-                                        print("")
-                                except json.JSONDecodeError:
-                                    # The line is not a complete JSON; wait for more data.
-                                    continue
-                                except Exception as e:
-                                    # generic error handling, quit for debug
-                                    print(f"Error processing chunk: {e}")
-                                    sys.exit()
+            client = http_client.get_async_client()
+            async with client.stream("POST", self.chat_url, headers=self.headers, json=data,
+                                     timeout=self.stream_timeout) as response:
+                print("Agent: ", end="")
+                async for chunk in response.aiter_text():
+                    if chunk:
+                        buffer += chunk
+                        # Process each complete line
+                        while "\n" in buffer:
+                            line, buffer = buffer.split("\n", 1)
+                            if line.startswith("data: "):
+                                line = line[len("data: "):]
+                            try:
+                                parsed_chunk = json.loads(line.strip())
+                                print(parsed_chunk.get("textResponse", ""), end="", flush=True)
+
+                                if parsed_chunk.get("close", False):
+                                    print("")
+                            except json.JSONDecodeError:
+                                # The line is not a complete JSON; wait for more data.
+                                continue
+                            except Exception as e:
+                                # generic error handling, quit for debug
+                                print(f"Error processing chunk: {e}")
+                                sys.exit()
         except httpx.RequestError as e:
             print(f"Streaming chat request failed. Error: {e}")
 
@@ -1,5 +1,6 @@
-import requests
 import yaml
+
+import http_client
 from prettyprinter import pprint
 
 def workspaces(
@@ -22,7 +23,7 @@ def workspaces(
         "Authorization": "Bearer " + api_key
     }
 
-    workspaces_response = requests.get(
+    workspaces_response = http_client.get_session().get(
         workspaces_url,
         headers=headers
     )